@@ -16,9 +16,13 @@ if config.config_file_name is not None:
 
 # add your model's MetaData object here
 # for 'autogenerate' support
-# from myapp import mymodel
-# target_metadata = mymodel.Base.metadata
-target_metadata = None
+from app.db.models import Base
+from app.db.session import sync_database_url
+target_metadata = Base.metadata
+
+# The database comes from DATABASE_URL like in the application,
+# not from the placeholder in alembic.ini
+config.set_main_option("sqlalchemy.url", sync_database_url.replace("%", "%%"))
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -0,0 +1,46 @@
+"""initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-19 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('username', sa.String(), nullable=True),
+        sa.Column('hashed_password', sa.String(), nullable=True),
+        sa.Column('role', sa.String(), nullable=True),
+    )
+    op.create_index('ix_users_username', 'users', ['username'], unique=True)
+    op.create_table(
+        'tasks',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('task_type', sa.String(), nullable=True),
+        sa.Column('prompt', sa.Text(), nullable=True),
+        sa.Column('status', sa.Enum('PENDING', 'IN_PROGRESS', 'COMPLETED', 'FAILED', name='taskstatus'), nullable=True),
+        sa.Column('result', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table('tasks')
+    sa.Enum(name='taskstatus').drop(op.get_bind(), checkfirst=True)
+    op.drop_index('ix_users_username', table_name='users')
+    op.drop_table('users')
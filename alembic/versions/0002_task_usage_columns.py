@@ -0,0 +1,41 @@
+"""task timing and usage columns
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 12:05:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('model', sa.String(), nullable=True),
+    sa.Column('backend', sa.String(), nullable=True),
+    sa.Column('prompt_tokens', sa.Integer(), nullable=True),
+    sa.Column('completion_tokens', sa.Integer(), nullable=True),
+    sa.Column('duration_ms', sa.Integer(), nullable=True),
+    sa.Column('load_ms', sa.Integer(), nullable=True),
+]
+
+
+def upgrade():
+    # Databases bootstrapped with create_all may already have some of these columns
+    existing = set()
+    if not op.get_context().as_sql:
+        existing = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('tasks')}
+    for column in COLUMNS:
+        if column.name not in existing:
+            op.add_column('tasks', column)
+
+
+def downgrade():
+    for column in reversed(COLUMNS):
+        op.drop_column('tasks', column.name)
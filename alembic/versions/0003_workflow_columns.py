@@ -0,0 +1,32 @@
+"""workflow spec and progress columns
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 12:10:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    sa.Column('workflow', sa.Text(), nullable=True),
+    sa.Column('steps_total', sa.Integer(), nullable=True),
+    sa.Column('steps_done', sa.Integer(), nullable=True),
+]
+
+
+def upgrade():
+    for column in COLUMNS:
+        op.add_column('tasks', column)
+
+
+def downgrade():
+    for column in reversed(COLUMNS):
+        op.drop_column('tasks', column.name)
@@ -1,4 +1,4 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from sqlalchemy import select
@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
 from app.db.models import User
 from app.core.config import settings
+from app.services.task_cache import CachedTask
 from typing import Optional
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -49,4 +50,16 @@ async def get_admin_user(current_user: User = Depends(get_current_user)):
             status_code=status.HTTP_403_FORBIDDEN,
             detail="The user doesn't have enough privileges"
         )
-    return current_user
\ No newline at end of file
+    return current_user
+
+def task_response(cached: CachedTask, request: Request) -> Response:
+    """
+    Ответ с ETag; 304 без тела, если клиент прислал тот же ETag в If-None-Match.
+    """
+    # Clients may cache the body but must revalidate it with the ETag
+    headers = {"ETag": cached.etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or cached.etag in
+                          (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
@@ -1,16 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from uuid import UUID
-from collections import Counter
 
 from app.db.session import get_db
 from app.db.models import User, Task, TaskStatus
 from app.schemas.users import User as UserSchema, UserCreate, UserUpdate
-from app.schemas.tasks import TaskResponse, TaskStatsByStatus, TaskStatsByType
-from app.api.deps import get_admin_user
+from app.schemas.tasks import TaskResponse, TaskStatsByStatus, TaskStatsByType, UsageStats, UserUsage, ModelUsage, TASK_RESPONSE_COLUMNS
+from app.core.responses import ORJSONResponse, rows_to_dicts
+from app.api.deps import get_admin_user, task_response
+from app.core.config import settings
+from app.services.usage import get_user_usage
+from app.services.task_cache import get_cached_task, cache_task, invalidate_task
 from passlib.context import CryptContext
-from sqlalchemy import select
+from sqlalchemy import select, func, case
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -135,13 +138,14 @@ async def get_all_tasks(
     Получение полного списка всех заданий в системе.
     Доступ: Только для администратора.
     """
-    result = await db.execute(select(Task))
-    tasks = result.scalars().all()
-    return tasks
+    # Read-only listing: plain rows serialized by orjson, no ORM objects
+    result = await db.execute(select(*TASK_RESPONSE_COLUMNS))
+    return ORJSONResponse(rows_to_dicts(result))
 
 @router.get("/tasks/{task_id}", response_model=TaskResponse)
 async def get_task_details(
     task_id: str,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     admin: User = Depends(get_admin_user)
 ):
@@ -149,15 +153,18 @@ async def get_task_details(
     Получение деталей конкретного задания, включая результат или ошибку.
     Доступ: Администратор может получить доступ к любому заданию.
     """
-    result = await db.execute(select(Task).filter(Task.id == task_id))
-    task = result.scalar_one_or_none()
-    if not task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Task not found"
-        )
-    
-    return task
+    cached = await get_cached_task(task_id)
+    if cached is None:
+        result = await db.execute(select(*TASK_RESPONSE_COLUMNS).filter(Task.id == task_id))
+        task = result.one_or_none()
+        if not task:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Task not found"
+            )
+        cached = await cache_task(task)
+
+    return task_response(cached, request)
 
 @router.delete("/tasks/{task_id}")
 async def delete_task(
@@ -180,6 +187,7 @@ async def delete_task(
     
     await db.delete(task)
     await db.commit()
+    await invalidate_task(task.id)
     return {"message": "Task deleted successfully"}
 
 # Statistics and Metrics Endpoints
@@ -193,9 +201,8 @@ async def get_task_stats_by_status(
     Получение количества заданий по каждому статусу.
     Доступ: Только для администратора.
     """
-    result = await db.execute(select(Task))
-    tasks = result.scalars().all()
-    status_counts = Counter(task.status for task in tasks)
+    result = await db.execute(select(Task.status, func.count(Task.id)).group_by(Task.status))
+    status_counts = dict(result.all())
     
     return TaskStatsByStatus(
         pending=status_counts.get(TaskStatus.PENDING, 0),
@@ -213,12 +220,82 @@ async def get_task_stats_by_type(
     Получение количества заданий по их типу.
     Доступ: Только для администратора.
     """
-    result = await db.execute(select(Task))
-    tasks = result.scalars().all()
-    type_counts = Counter(task.task_type for task in tasks)
+    result = await db.execute(select(Task.task_type, func.count(Task.id)).group_by(Task.task_type))
+    type_counts = dict(result.all())
     
     return TaskStatsByType(
         summarization=type_counts.get("summarization", 0),
         translation=type_counts.get("translation", 0),
-        code_generation=type_counts.get("code_generation", 0)
-    )
\ No newline at end of file
+        code_generation=type_counts.get("code_generation", 0),
+        workflow=type_counts.get("workflow", 0)
+    )
+
+@router.get("/stats/usage", response_model=UsageStats)
+async def get_usage_stats(
+    db: AsyncSession = Depends(get_db),
+    admin: User = Depends(get_admin_user)
+):
+    """
+    Получение статистики использования LLM по пользователям и моделям.
+    Доступ: Только для администратора.
+    """
+    user_rows = await db.execute(
+        select(
+            Task.user_id,
+            User.username,
+            func.count(Task.id),
+            func.coalesce(func.sum(Task.prompt_tokens), 0),
+            func.coalesce(func.sum(Task.completion_tokens), 0),
+        )
+        .outerjoin(User, User.id == Task.user_id)
+        .group_by(Task.user_id, User.username)
+    )
+    by_user = []
+    for user_id, username, tasks, prompt_tokens, completion_tokens in user_rows.all():
+        window = {"tasks": 0, "tokens": 0}
+        try:
+            window = await get_user_usage(user_id)
+        except Exception as e:
+            print(f"Failed to read usage counters for user {user_id}: {str(e)}")
+        by_user.append(UserUsage(
+            user_id=user_id,
+            username=username,
+            tasks=tasks,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            window_tasks=window["tasks"],
+            window_tokens=window["tokens"]
+        ))
+
+    # Load time of tasks that had to wait for the model to be loaded, NULL otherwise
+    cold_start = case((Task.load_ms >= settings.COLD_START_THRESHOLD_MS, Task.load_ms))
+    model_rows = await db.execute(
+        select(
+            Task.model,
+            Task.backend,
+            func.count(Task.id),
+            func.coalesce(func.sum(Task.prompt_tokens), 0),
+            func.coalesce(func.sum(Task.completion_tokens), 0),
+            func.avg(Task.duration_ms),
+            func.count(cold_start),
+            func.avg(cold_start),
+        )
+        .filter(Task.model.isnot(None))
+        .group_by(Task.model, Task.backend)
+    )
+    by_model = [
+        ModelUsage(
+            model=model,
+            backend=backend,
+            tasks=tasks,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            avg_duration_ms=float(avg_duration) if avg_duration is not None else None,
+            cold_starts=cold_starts,
+            avg_cold_start_ms=float(avg_cold_start) if avg_cold_start is not None else None
+        )
+        for model, backend, tasks, prompt_tokens, completion_tokens, avg_duration, cold_starts, avg_cold_start
+        in model_rows.all()
+    ]
+
+    return UsageStats(by_user=by_user, by_model=by_model)
\ No newline at end of file
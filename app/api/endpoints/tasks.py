@@ -1,14 +1,20 @@
+import json
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from sqlalchemy import select
 
+from app.core.config import settings
 from app.db.session import get_db
 from app.db.models import Task, User, TaskStatus
-from app.schemas.tasks import TaskCreate, TaskResponse
-from app.tasks.celery_worker import celery_app
-from app.api.deps import get_current_user
+from app.schemas.tasks import TaskCreate, TaskResponse, TASK_RESPONSE_COLUMNS
+from app.core.responses import ORJSONResponse, rows_to_dicts
+from app.tasks.celery_app import celery_app
+from app.api.deps import get_current_user, task_response
+from app.services.usage import is_over_quota, record_submission
+from app.services.task_cache import get_cached_task, cache_task
+from app.services.workflow import WORKFLOW_TASK_TYPE, workflow_levels
 
 router = APIRouter(tags=["tasks"])
 
@@ -21,6 +27,16 @@ async def create_task(
     """
     Создание нового задания.
     """
+    # Проверяем квоту пользователя до постановки задачи в очередь
+    over_quota = False
+    try:
+        over_quota = await is_over_quota(current_user.id)
+    except Exception as e:
+        # Quota storage being down should not block task submission
+        print(f"Failed to check quota for user {current_user.id}: {str(e)}")
+    if over_quota and settings.QUOTA_ACTION == "reject":
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Usage quota exceeded")
+
     # Создаем запись в БД
     new_task_id = str(uuid.uuid4())
     db_task = Task(
@@ -30,19 +46,52 @@ async def create_task(
         prompt=task_in.prompt,
         status=TaskStatus.PENDING
     )
+    if task_in.task_type == WORKFLOW_TASK_TYPE:
+        db_task.workflow = json.dumps(_workflow_spec(task_in))
+        db_task.steps_total = len(task_in.steps)
+        db_task.steps_done = 0
+    elif task_in.steps is not None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Steps are only allowed for task type {WORKFLOW_TASK_TYPE}")
     db.add(db_task)
     await db.commit()
     await db.refresh(db_task)
 
     # Отправляем задачу в Celery для обработки ONLY after ensuring it's committed
     try:
-        celery_app.send_task('app.tasks.celery_worker.process_llm_task', args=[new_task_id])
+        # Over-quota users are queued with the lowest priority when not rejected
+        priority = settings.OVER_QUOTA_TASK_PRIORITY if over_quota else None
+        celery_app.send_task('app.tasks.celery_worker.process_llm_task', args=[new_task_id], priority=priority)
     except Exception as e:
         # If Celery fails, we should log the error but not fail the request
         print(f"Failed to queue task {new_task_id}: {str(e)}")
 
+    try:
+        await record_submission(current_user.id)
+    except Exception as e:
+        print(f"Failed to record usage for user {current_user.id}: {str(e)}")
+
     return {"task_id": new_task_id, "status": db_task.status}
 
+def _workflow_spec(task_in: TaskCreate) -> dict:
+    """
+    Проверяет шаги workflow и возвращает спецификацию для воркера.
+    """
+    if not task_in.steps:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Workflow steps are required")
+    if len(task_in.steps) > settings.WORKFLOW_MAX_STEPS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Workflow has more than {settings.WORKFLOW_MAX_STEPS} steps")
+    steps = [step.model_dump() for step in task_in.steps]
+    try:
+        workflow_levels(steps)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    output = task_in.output or steps[-1]["id"]
+    if output not in {step["id"] for step in steps}:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown output step: {output}")
+    return {"steps": steps, "output": output}
+
 @router.get("/tasks/all", response_model=List[TaskResponse])
 async def get_all_tasks(
     current_user: User = Depends(get_current_user),
@@ -54,26 +103,30 @@ async def get_all_tasks(
     if current_user.role != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
     
-    result = await db.execute(select(Task))
-    tasks = result.scalars().all()
-    return tasks
+    # Read-only listing: plain rows serialized by orjson, no ORM objects
+    result = await db.execute(select(*TASK_RESPONSE_COLUMNS))
+    return ORJSONResponse(rows_to_dicts(result))
 
 @router.get("/tasks/{task_id}", response_model=TaskResponse)
 async def get_task_status(
     task_id: str,
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Проверка статуса задания.
+    Проверка статуса задания. Поддерживает ETag/If-None-Match.
     """
-    result = await db.execute(select(Task).filter(Task.id == task_id))
-    task = result.scalar_one_or_none()
-    if not task:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
-    
+    cached = await get_cached_task(task_id)
+    if cached is None:
+        result = await db.execute(select(*TASK_RESPONSE_COLUMNS).filter(Task.id == task_id))
+        task = result.one_or_none()
+        if not task:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+        cached = await cache_task(task)
+
     # Пользователь может видеть только свои задания
-    if task.user_id != current_user.id and current_user.role != "admin":
+    if cached.user_id != str(current_user.id) and current_user.role != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view this task")
 
-    return task
\ No newline at end of file
+    return task_response(cached, request)
\ No newline at end of file
@@ -1,3 +1,4 @@
+from typing import Dict, Literal
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -7,12 +8,48 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     CELERY_BROKER_URL: str
     CELERY_RESULT_BACKEND: str
-    # OPENAI_API_KEY: str  # Not needed if Ollama is default
+    OPENAI_API_KEY: str = ""  # Only needed if LLM_PROVIDER is "openai"
     LLM_PROVIDER: str = "ollama"  # Default LLM provider
     LLM_MODEL: str = "llama3"  # Default model for Ollama
     OLLAMA_BASE_URL: str = "http://localhost:11434"  # Ollama server URL
+    OLLAMA_BASE_URLS: str = ""  # Comma-separated Ollama backends; defaults to OLLAMA_BASE_URL
+    ROUTING_STRATEGY: Literal["prefix", "least_loaded"] = "prefix"  # How a request picks one of OLLAMA_BASE_URLS
+    PREFIX_ROUTING_CHARS: int = 256  # Prompt prefix length used for backend affinity
+    ROUTING_LOAD_FACTOR: float = 1.25  # Max backend load relative to the average before spilling over
+    TASK_MODELS: Dict[str, str] = {}  # Per task type model override, e.g. {"translation": "llama3"}
+    OLLAMA_KEEP_ALIVE: str = "30m"  # How long Ollama keeps a model loaded after a request
+    OLLAMA_KEEP_ALIVE_INTERVAL: int = 300  # Seconds between keep-alive pings, 0 disables them
+    OLLAMA_WARMUP_ON_START: bool = True  # Preload configured models when a worker starts
+    COLD_START_THRESHOLD_MS: int = 500  # Model load time above which a task counts as a cold start
+    SUMMARY_CHUNK_TOKENS: int = 2000  # Documents longer than this are summarized in chunks
+    SUMMARY_REDUCE_FANIN: int = 8  # Partial summaries combined by one reduce step
+    LLM_CACHE_TTL: int = 7 * 24 * 3600  # Seconds to keep cached chunk and workflow step results
+    WORKFLOW_MAX_STEPS: int = 20  # Steps allowed in one workflow task
+    SEMANTIC_CACHE_ENABLED: bool = False  # Serve near-duplicate prompts from an in-process cache
+    SEMANTIC_CACHE_THRESHOLD: float = 0.9  # Minimum cosine similarity for a cache hit
+    SEMANTIC_CACHE_SIZE: int = 10000  # Entries per task type and model before eviction
+    SEMANTIC_CACHE_DIM: int = 1024  # Dimension of the hashed n-gram vectors
+    SEMANTIC_CACHE_MATCH: Literal["exact", "typo", "similarity"] = "exact"  # What a cache hit may differ by
+    TASK_CACHE_ENABLED: bool = True  # Serve task lookups from Redis and an in-process LRU
+    TASK_CACHE_INFLIGHT_TTL: int = 2  # Seconds to cache pending and in-progress tasks
+    TASK_CACHE_TERMINAL_TTL: int = 0  # Seconds to keep completed and failed tasks in Redis, 0 keeps them
+    TASK_CACHE_LOCAL_SIZE: int = 1024  # Entries of the in-process LRU of each API process
+    TASK_CACHE_LOCAL_TTL: int = 60  # Upper bound on how long a process serves its own copy
+    WORKER_METRICS_PORT: int = 9808  # Port of the worker's Prometheus exporter, 0 disables it
+    TRACING_ENABLED: bool = False
+    TRACE_SAMPLE_RATIO: float = 0.1  # Share of new traces that are recorded
+    TRACE_SERVICE_NAME: str = "llm-orchestra"
+    TRACE_EXPORT_FILE: str = "traces.jsonl"  # JSON Lines file for finished spans, empty disables it
+    TRACE_OTLP_ENDPOINT: str = ""  # OTLP/HTTP collector, e.g. http://localhost:4318/v1/traces
     ADMIN_USERNAME: str = "admin"
     ADMIN_PASSWORD: str = "admin"
+    REDIS_URL: str = "redis://localhost:6379/0"
+    # Per-user quotas over a rolling window (0 disables the limit)
+    USER_TOKEN_QUOTA: int = 0
+    USER_TASK_QUOTA: int = 0
+    QUOTA_WINDOW_HOURS: int = 24
+    QUOTA_ACTION: Literal["reject", "deprioritize"] = "reject"
+    OVER_QUOTA_TASK_PRIORITY: int = 9  # Celery priority for over-quota users (0 is highest)
 
     class Config:
         env_file = ".env"
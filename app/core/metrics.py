@@ -0,0 +1,112 @@
+# app/core/metrics.py
+# Prometheus metrics shared by the API and the Celery worker
+
+import os
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess, start_http_server
+)
+from prometheus_client.core import GaugeMetricFamily
+import redis
+from app.core.config import settings
+
+# LLM calls take seconds to minutes, HTTP and DB calls milliseconds
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "API request latency",
+    ["method", "route", "status"], buckets=FAST_BUCKETS
+)
+QUEUE_WAIT = Histogram(
+    "task_queue_wait_seconds", "Time between task creation (or publishing, for subtasks) and the worker picking it up",
+    ["task_type"], buckets=LLM_BUCKETS
+)
+LLM_LATENCY = Histogram(
+    "llm_request_duration_seconds", "Duration of a single LLM call",
+    ["model", "backend"], buckets=LLM_BUCKETS
+)
+LLM_TTFT = Histogram(
+    "llm_time_to_first_token_seconds", "Time until the LLM streamed its first token",
+    ["model", "backend"], buckets=LLM_BUCKETS
+)
+MODEL_LOAD = Histogram(
+    "llm_model_load_seconds", "Model load time reported by Ollama for cold starts (at least COLD_START_THRESHOLD_MS)",
+    ["model", "backend"], buckets=LLM_BUCKETS
+)
+DB_QUERY = Histogram(
+    "db_query_duration_seconds", "Database statement execution time",
+    ["engine"], buckets=FAST_BUCKETS
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by cache and outcome",
+    ["cache", "result"]
+)
+TASKS_IN_FLIGHT = Gauge(
+    "celery_tasks_in_flight", "Celery tasks currently executing",
+    ["task"], multiprocess_mode="livesum"
+)
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+class QueueDepthCollector:
+    """
+    Глубина очередей Celery в Redis, считываемая при каждом опросе /metrics.
+    """
+    # Priority sub-queues created by the Redis transport, see broker_transport_options
+    PRIORITY_STEPS = range(1, 10)
+
+    def __init__(self, queues=("celery",)):
+        self.queues = queues
+        self.client = redis.Redis.from_url(settings.CELERY_BROKER_URL)
+
+    def collect(self):
+        family = GaugeMetricFamily("celery_queue_depth", "Messages waiting in Celery queues", labels=["queue"])
+        try:
+            pipe = self.client.pipeline()
+            for queue in self.queues:
+                pipe.llen(queue)
+                for step in self.PRIORITY_STEPS:
+                    pipe.llen(f"{queue}:{step}")
+            lengths = pipe.execute()
+        except Exception as e:
+            print(f"Failed to read Celery queue depth: {str(e)}")
+            return [family]
+        per_queue = len(self.PRIORITY_STEPS) + 1
+        for i, queue in enumerate(self.queues):
+            family.add_metric([queue], sum(lengths[i * per_queue:(i + 1) * per_queue]))
+        return [family]
+
+# Collectors that are only registered by the API process
+_api_registry = CollectorRegistry()
+
+def register_queue_depth_collector():
+    # Queue depth is read straight from Redis; other brokers are not supported
+    if settings.CELERY_BROKER_URL.startswith(("redis://", "rediss://", "unix://")):
+        _api_registry.register(QueueDepthCollector())
+
+def _registry():
+    # Prefork workers (and multi-process servers) write metrics to
+    # PROMETHEUS_MULTIPROC_DIR; aggregate them at scrape time.
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+def render_metrics():
+    """
+    Возвращает метрики в текстовом формате Prometheus и их content type.
+    """
+    return generate_latest(_registry()) + generate_latest(_api_registry), CONTENT_TYPE_LATEST
+
+def start_worker_metrics_server(port: int):
+    """
+    HTTP-экспортер метрик воркера Celery.
+    """
+    start_http_server(port, registry=_registry())
+
+def mark_process_dead(pid: int):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,21 @@
+# app/core/responses.py
+# Fast JSON responses for large read-only listings
+
+from typing import Any, List
+import orjson
+from fastapi.responses import JSONResponse
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON-ответ, сериализуемый orjson. UUID, datetime и Enum
+    кодируются так же, как в моделях Pydantic, но без их создания.
+    """
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+def rows_to_dicts(result) -> List[dict]:
+    """
+    Строки результата запроса в словари по именам колонок.
+    """
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
@@ -1,44 +1,64 @@
 # app/core/startup.py
-# Startup events for the application
+# One-shot bootstrap of the database: migrations and the admin user.
+# Run it once per deployment before starting the API and the workers:
+#
+#     python -m app.core.startup
 
-from sqlalchemy.orm import Session
+import os
+import sys
+from sqlalchemy import inspect
+from sqlalchemy.orm import sessionmaker
 from app.db.models import User
-from app.db.session import sync_engine
+from app.db.session import get_sync_engine
 from app.core.config import settings
 from passlib.context import CryptContext
 import traceback
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+# Schema created by Base.metadata.create_all before migrations were introduced
+INITIAL_REVISION = "0001"
+
+def run_migrations():
+    """
+    Применяет миграции Alembic до последней версии.
+    База, созданная раньше через create_all, сначала помечается начальной ревизией.
+    """
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(os.path.join(PROJECT_ROOT, "alembic.ini"))
+    # Resolve the scripts independently of the working directory
+    config.set_main_option("script_location", os.path.join(PROJECT_ROOT, "alembic"))
+
+    tables = inspect(get_sync_engine()).get_table_names()
+    if "users" in tables and "alembic_version" not in tables:
+        print(f"Existing schema without migration history, stamping revision {INITIAL_REVISION}...")
+        command.stamp(config, INITIAL_REVISION)
+
+    print("Applying database migrations...")
+    command.upgrade(config, "head")
+    print("Database migrations applied successfully.")
+
 def create_admin_user_if_not_exists():
     """
     Create an admin user if one doesn't exist yet.
-    This function uses the sync engine to work with the database during startup.
+    This function uses the sync engine and expects the schema to be migrated.
     """
     print(f"Attempting to create admin user with username: {settings.ADMIN_USERNAME}")
+    sync_engine = get_sync_engine()
     print(f"Database URL: {sync_engine.url}")
-    
-    # Create all tables if they don't exist
-    from app.db.models import Base
-    try:
-        print("Creating database tables if they don't exist...")
-        Base.metadata.create_all(bind=sync_engine)
-        print("Database tables created successfully.")
-    except Exception as e:
-        print(f"Error creating database tables: {e}")
-        traceback.print_exc()
-        return
-    
+
     # Create a sync session
-    from sqlalchemy.orm import sessionmaker
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
     db = SessionLocal()
-    
+
     try:
         print("Checking if admin user already exists...")
         # Check if admin user already exists
         admin_user = db.query(User).filter(User.username == settings.ADMIN_USERNAME).first()
-        
+
         if not admin_user:
             print("Admin user does not exist. Creating...")
             # Create admin user
@@ -58,4 +78,20 @@ def create_admin_user_if_not_exists():
         print(f"Error creating admin user: {e}")
         traceback.print_exc()
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def bootstrap():
+    """
+    Подготовка базы данных перед запуском API и воркеров.
+    """
+    try:
+        run_migrations()
+    except Exception as e:
+        print(f"Error applying database migrations: {e}")
+        traceback.print_exc()
+        return 1
+    create_admin_user_if_not_exists()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(bootstrap())
@@ -0,0 +1,232 @@
+# app/core/tracing.py
+# Lightweight OpenTelemetry-style tracing with W3C trace context propagation
+
+import json
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from app.core.config import settings
+
+_current_span: ContextVar = ContextVar("current_span", default=None)
+
+class SpanContext:
+    def __init__(self, trace_id: str, span_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    """
+    Разбирает заголовок W3C traceparent ("00-<trace_id>-<span_id>-<flags>").
+    """
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+    return SpanContext(parts[1], parts[2], sampled)
+
+class Span:
+    """
+    Операция трассы. Несэмплированные спаны только передают контекст
+    и ничего не записывают.
+    """
+    def __init__(self, name: str, context: SpanContext, parent_id: Optional[str], attributes: dict = None):
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {}) if context.sampled else {}
+        self.status = "OK"
+        self.start_ns = time.time_ns() if context.sampled else 0
+        self.end_ns = None
+
+    def set_attribute(self, key: str, value):
+        if self.context.sampled and value is not None:
+            self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException):
+        if self.context.sampled:
+            self.status = "ERROR"
+            self.attributes["exception.type"] = type(exc).__name__
+            self.attributes["exception.message"] = str(exc)
+
+    def end(self):
+        if self.context.sampled and self.end_ns is None:
+            self.end_ns = time.time_ns()
+            _exporter.export(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "traceId": self.context.trace_id,
+            "spanId": self.context.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+            "status": self.status,
+            "service": settings.TRACE_SERVICE_NAME,
+        }
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+_NOOP_SPAN = Span("noop", SpanContext("0" * 32, "0" * 16, False), None)
+
+def start_span(name: str, parent: Optional[SpanContext] = None, attributes: dict = None) -> Span:
+    """
+    Создает спан, не делая его текущим. Родитель - parent или текущий спан;
+    корневой спан сэмплируется с вероятностью TRACE_SAMPLE_RATIO.
+    """
+    if not settings.TRACING_ENABLED:
+        return _NOOP_SPAN
+    if parent is None:
+        current = _current_span.get()
+        parent = current.context if current is not None else None
+    if parent is not None:
+        trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+    else:
+        trace_id, parent_id = _new_id(128), None
+        sampled = random.random() < settings.TRACE_SAMPLE_RATIO
+    return Span(name, SpanContext(trace_id, _new_id(64), sampled), parent_id, attributes)
+
+@contextmanager
+def span(name: str, parent: Optional[SpanContext] = None, attributes: dict = None):
+    """
+    Контекстный менеджер: спан становится текущим на время блока.
+    """
+    current = start_span(name, parent, attributes)
+    token = activate(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.record_exception(e)
+        raise
+    finally:
+        deactivate(token)
+        current.end()
+
+def activate(current: Span):
+    """
+    Делает спан текущим; возвращает токен для deactivate.
+    """
+    return _current_span.set(current)
+
+def deactivate(token):
+    _current_span.reset(token)
+
+def current_traceparent() -> Optional[str]:
+    """
+    Заголовок traceparent текущего спана для передачи в другой процесс.
+    """
+    current = _current_span.get()
+    if current is None or current is _NOOP_SPAN:
+        return None
+    return current.context.traceparent()
+
+class BatchExporter:
+    """
+    Копит завершенные спаны в очереди и выгружает их пачками в фоновом потоке:
+    в JSON Lines файл и/или в OTLP-совместимый HTTP-коллектор.
+    """
+    MAX_QUEUE = 10000
+    BATCH_SIZE = 512
+    FLUSH_INTERVAL = 1.0
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=self.MAX_QUEUE)
+        self._pid = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def _ensure_thread(self):
+        # Celery prefork children inherit the object but not the thread
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                threading.Thread(target=self._run, daemon=True).start()
+
+    def export(self, finished: Span):
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(finished)
+        except queue.Full:
+            # Never block request handling on tracing
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            batch = []
+            deadline = time.monotonic() + self.FLUSH_INTERVAL
+            while len(batch) < self.BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            if batch:
+                self._flush([s.to_dict() for s in batch])
+
+    def _flush(self, spans):
+        try:
+            if settings.TRACE_EXPORT_FILE:
+                with open(settings.TRACE_EXPORT_FILE, "a") as f:
+                    f.write("".join(json.dumps(s) + "\n" for s in spans))
+            if settings.TRACE_OTLP_ENDPOINT:
+                import httpx
+                httpx.post(settings.TRACE_OTLP_ENDPOINT, json=_otlp_payload(spans), timeout=5)
+        except Exception as e:
+            print(f"Failed to export {len(spans)} spans: {str(e)}")
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def _otlp_payload(spans) -> dict:
+    """
+    Спаны в формате OTLP/HTTP JSON (POST /v1/traces).
+    """
+    otlp_spans = []
+    for s in spans:
+        otlp_spans.append({
+            "traceId": s["traceId"],
+            "spanId": s["spanId"],
+            "parentSpanId": s["parentSpanId"] or "",
+            "name": s["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(s["startTimeUnixNano"]),
+            "endTimeUnixNano": str(s["endTimeUnixNano"]),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s["attributes"].items()],
+            "status": {"code": 2 if s["status"] == "ERROR" else 1},
+        })
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": settings.TRACE_SERVICE_NAME}}
+            ]},
+            "scopeSpans": [{"scope": {"name": "app.core.tracing"}, "spans": otlp_spans}],
+        }]
+    }
+
+_exporter = BatchExporter()
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, Text, UUID, Enum, DateTime
+from sqlalchemy import Column, String, Text, UUID, Enum, DateTime, Integer
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.ext.declarative import declarative_base
 import enum
@@ -31,4 +31,16 @@ class Task(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
     # Add created_at and completed_at fields for better task tracking
-    # These fields might be useful for the UI
\ No newline at end of file
+    # These fields might be useful for the UI
+    started_at = Column(DateTime, nullable=True)
+    # Usage accounting filled in by the worker
+    model = Column(String, nullable=True)
+    backend = Column(String, nullable=True)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    duration_ms = Column(Integer, nullable=True)
+    load_ms = Column(Integer, nullable=True)
+    # Workflow tasks: JSON spec of the steps and progress across them
+    workflow = Column(Text, nullable=True)
+    steps_total = Column(Integer, nullable=True)
+    steps_done = Column(Integer, nullable=True)
\ No newline at end of file
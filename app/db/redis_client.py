@@ -0,0 +1,21 @@
+# app/db/redis_client.py
+# Shared Redis clients for usage counters, routing, model residency and caches
+
+import redis
+import redis.asyncio as aioredis
+from app.core.config import settings
+
+_sync_client = None
+_async_client = None
+
+def get_sync_redis():
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _sync_client
+
+def get_async_redis():
+    global _async_client
+    if _async_client is None:
+        _async_client = aioredis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _async_client
@@ -1,10 +1,13 @@
 # app/db/session.py
 # Настройка сессии SQLAlchemy
 
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.metrics import DB_QUERY
+from app.core.tracing import start_span
 
 # Async engine and session
 async_engine = create_async_engine(settings.DATABASE_URL, echo=True)
@@ -14,7 +17,40 @@ AsyncSessionLocal = sessionmaker(
 
 # Sync engine for Alembic
 sync_database_url = settings.DATABASE_URL.replace("+asyncpg", "")
-sync_engine = create_engine(sync_database_url, echo=True)
+
+# Query timing for Prometheus and tracing
+def _instrument(engine, name: str):
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_start = time.perf_counter()
+        context._trace_span = start_span("db.query", attributes={"db.engine": name, "db.statement": statement[:500]})
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        DB_QUERY.labels(engine=name).observe(time.perf_counter() - context._query_start)
+        context._trace_span.end()
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        trace_span = getattr(exception_context.execution_context, "_trace_span", None)
+        if trace_span is not None:
+            trace_span.record_exception(exception_context.original_exception)
+            trace_span.end()
+
+_instrument(async_engine.sync_engine, "async")
+
+_sync_engine = None
+
+def get_sync_engine():
+    """
+    Синхронный движок (воркер Celery, миграции). Создается при первом
+    обращении, чтобы API не загружал синхронный драйвер БД.
+    """
+    global _sync_engine
+    if _sync_engine is None:
+        _sync_engine = create_engine(sync_database_url, echo=True)
+        _instrument(_sync_engine, "sync")
+    return _sync_engine
 
 # Dependency
 async def get_db():
@@ -1,8 +1,10 @@
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.endpoints import auth, tasks, users
 from app.api.endpoints.admin import router as admin_router
-from app.core.startup import create_admin_user_if_not_exists
+from app.core.metrics import REQUEST_LATENCY, register_queue_depth_collector, render_metrics
+from app.core.tracing import span, parse_traceparent
 
 app = FastAPI(title="LLM Orchestrator Service")
 
@@ -16,10 +18,37 @@ app.add_middleware(
     expose_headers=["Authorization"],
 )
 
-# Startup event to create admin user if not exists
-@app.on_event("startup")
-async def startup_event():
-    create_admin_user_if_not_exists()
+register_queue_depth_collector()
+
+@app.middleware("http")
+async def measure_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Label by route template, not the raw path, to keep cardinality bounded
+        route = request.scope.get("route")
+        REQUEST_LATENCY.labels(
+            method=request.method,
+            route=route.path if route else "unmatched",
+            status=status_code
+        ).observe(time.perf_counter() - started)
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    # Continue the caller's trace if it sent a W3C traceparent header
+    parent = parse_traceparent(request.headers.get("traceparent"))
+    with span(f"{request.method} {request.url.path}", parent=parent) as current:
+        current.set_attribute("http.method", request.method)
+        response = await call_next(request)
+        route = request.scope.get("route")
+        if route:
+            current.name = f"{request.method} {route.path}"
+        current.set_attribute("http.status_code", response.status_code)
+        return response
 
 app.include_router(auth.router, tags=["Authentication"])
 app.include_router(tasks.router, tags=["Tasks"])
@@ -28,4 +57,9 @@ app.include_router(admin_router)
 
 @app.get("/")
 def read_root():
-    return {"message": "Welcome to the LLM Orchestrator Service"}
\ No newline at end of file
+    return {"message": "Welcome to the LLM Orchestrator Service"}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    data, content_type = render_metrics()
+    return Response(content=data, media_type=content_type)
\ No newline at end of file
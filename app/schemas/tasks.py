@@ -1,12 +1,21 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional
 from uuid import UUID
-from app.db.models import TaskStatus
+from app.db.models import Task, TaskStatus
 from datetime import datetime
 
+class WorkflowStep(BaseModel):
+    id: str
+    task_type: str
+    # Steps whose results form this step's input; without them the step gets the task prompt
+    after: List[str] = []
+
 class TaskCreate(BaseModel):
     task_type: str
     prompt: str
+    # Only for task_type "workflow"
+    steps: Optional[List[WorkflowStep]] = None
+    output: Optional[str] = None  # Step whose result becomes the task result, the last step by default
 
 class TaskStatusResponse(BaseModel):
     task_id: str
@@ -22,9 +31,21 @@ class TaskResponse(BaseModel):
     result: Optional[str] = None
     created_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
-    
-    class Config:
-        orm_mode = True
+    started_at: Optional[datetime] = None
+    model: Optional[str] = None
+    backend: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    duration_ms: Optional[int] = None
+    load_ms: Optional[int] = None
+    steps_total: Optional[int] = None
+    steps_done: Optional[int] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+# Columns selected for read-only task responses, in TaskResponse field order.
+# Row tuples skip the ORM identity map and attribute instrumentation.
+TASK_RESPONSE_COLUMNS = tuple(getattr(Task, name) for name in TaskResponse.model_fields)
 
 class TaskStatsByStatus(BaseModel):
     pending: int = 0
@@ -36,4 +57,29 @@ class TaskStatsByType(BaseModel):
     summarization: int = 0
     translation: int = 0
     code_generation: int = 0
-    # Add more task types as needed
\ No newline at end of file
+    workflow: int = 0
+    # Add more task types as needed
+
+class UserUsage(BaseModel):
+    user_id: UUID
+    username: Optional[str] = None
+    tasks: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    # Rolling-window counters used for quota enforcement
+    window_tasks: int = 0
+    window_tokens: int = 0
+
+class ModelUsage(BaseModel):
+    model: Optional[str] = None
+    backend: Optional[str] = None
+    tasks: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    avg_duration_ms: Optional[float] = None
+    cold_starts: int = 0
+    avg_cold_start_ms: Optional[float] = None
+
+class UsageStats(BaseModel):
+    by_user: List[UserUsage] = []
+    by_model: List[ModelUsage] = []
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional
 from uuid import UUID
 
@@ -11,9 +11,8 @@ class User(BaseModel):
     id: UUID
     username: str
     role: str
-    
-    class Config:
-        orm_mode = True
+
+    model_config = ConfigDict(from_attributes=True)
 
 class UserUpdate(BaseModel):
     role: Optional[str] = None
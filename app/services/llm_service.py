@@ -1,41 +1,160 @@
 from langchain_community.llms import OpenAI
 from langchain_ollama import OllamaLLM
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
+import time
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.prompts import PromptTemplate
 from app.core.config import settings
+from app.core.metrics import LLM_LATENCY, LLM_TTFT, MODEL_LOAD, record_cache
+from app.core.tracing import span
+from app.services.routing import get_router
+from app.services.model_manager import model_for_task, get_resident_backends, mark_resident
+from app.services.semantic_cache import get_semantic_cache
+from app.services.templates import TASK_TEMPLATES
+from app.services.llm_utils import estimate_tokens
+
+_ollama_clients = {}
+
+def get_ollama_llm(model: str, base_url: str) -> OllamaLLM:
+    """
+    Возвращает клиента Ollama для пары (модель, бэкенд), переиспользуя его между задачами.
+    """
+    key = (model, base_url)
+    if key not in _ollama_clients:
+        _ollama_clients[key] = OllamaLLM(
+            model=model,
+            base_url=base_url,
+            keep_alive=settings.OLLAMA_KEEP_ALIVE
+        )
+    return _ollama_clients[key]
+
+class FirstTokenTimer(BaseCallbackHandler):
+    """
+    Запоминает момент получения первого токена от стримящего бэкенда.
+    """
+    def __init__(self):
+        self.first_token_at = None
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
 
 class LLMService:
     def __init__(self):
         # Initialize LLM based on provider setting
-        if settings.LLM_PROVIDER == "ollama":
-            self.llm = OllamaLLM(
-                model=settings.LLM_MODEL,
-                base_url=settings.OLLAMA_BASE_URL
-            )
-        elif settings.LLM_PROVIDER == "openai":
+        if settings.LLM_PROVIDER == "openai":
             self.llm = OpenAI(openai_api_key=settings.OPENAI_API_KEY)
+            self.model = self.llm.model_name
+            self.backend = "openai"
+            self.router = None
         else:
             # Default to Ollama if provider not specified or invalid
-            self.llm = OllamaLLM(
-                model=settings.LLM_MODEL,
-                base_url=settings.OLLAMA_BASE_URL
-            )
+            self.llm = get_ollama_llm(settings.LLM_MODEL, settings.OLLAMA_BASE_URL)
+            self.model = settings.LLM_MODEL
+            self.backend = settings.OLLAMA_BASE_URL
+            # Ollama backends are picked per prompt to reuse their prompt cache
+            self.router = get_router()
+        # Usage of the last run_task call: model, backend, prompt/completion tokens
+        self.last_usage = {}
 
-    def run_task(self, task_type: str, prompt: str) -> str:
+    def run_task(self, task_type: str, prompt: str, template: str = None) -> str:
         """
         Запускает задачу на основе типа и промпта.
+        template заменяет шаблон типа задачи (например, для частей длинного документа).
         """
-        if task_type == "summarization":
-            template = "Summarize the following text:\n{text}"
-            prompt_template = PromptTemplate(template=template, input_variables=["text"])
-            chain = LLMChain(prompt=prompt_template, llm=self.llm)
-            result = chain.run(text=prompt)
-            return result
-        elif task_type == "translation":
-            template = "Translate the following text to English:\n{text}"
-            prompt_template = PromptTemplate(template=template, input_variables=["text"])
-            chain = LLMChain(prompt=prompt_template, llm=self.llm)
-            result = chain.run(text=prompt)
+        with span("llm.run_task", attributes={"task.type": task_type}) as current:
+            result = self._run_task(task_type, prompt, template)
+            for key in ("model", "backend", "prompt_tokens", "completion_tokens", "load_ms"):
+                current.set_attribute(f"llm.{key}", self.last_usage.get(key))
             return result
+
+    def _run_task(self, task_type: str, prompt: str, template: str = None) -> str:
+        template = template or TASK_TEMPLATES.get(task_type)
+        if template is None:
+            raise ValueError(f"Unknown task type: {task_type}")
+
+        if self.router is not None:
+            self.model = model_for_task(task_type)
+
+        # Near-duplicate prompts of the same task type are served from the semantic cache
+        cache = get_semantic_cache() if template == TASK_TEMPLATES.get(task_type) else None
+        if cache is not None:
+            cached = cache.get(task_type, self.model, prompt)
+            record_cache("semantic", cached is not None)
+            if cached is not None:
+                self.last_usage = {
+                    "model": self.model,
+                    "backend": "semantic_cache",
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "load_ms": None,
+                }
+                return cached
+
+        prompt_template = PromptTemplate(template=template, input_variables=["text"])
+        text = prompt_template.format(text=prompt)
+        if self.router is None:
+            llm_result = self._generate(self.llm, text)
         else:
-            raise ValueError(f"Unknown task type: {task_type}")
\ No newline at end of file
+            llm_result = self._run_ollama(text)
+        generation = llm_result.generations[0][0]
+        self.last_usage = self._extract_usage(llm_result, generation, text)
+        # Warm calls also report a few milliseconds of load time; count only cold starts
+        load_ms = self.last_usage["load_ms"]
+        if load_ms is not None and load_ms >= settings.COLD_START_THRESHOLD_MS:
+            MODEL_LOAD.labels(model=self.model, backend=self.backend).observe(load_ms / 1000)
+
+        if cache is not None:
+            cache.put(task_type, self.model, prompt, generation.text)
+        return generation.text
+
+    def _generate(self, llm, text: str):
+        """
+        Вызов LLM с замером общей длительности и времени до первого токена.
+        """
+        timer = FirstTokenTimer()
+        started = time.perf_counter()
+        llm_result = llm.generate([text], callbacks=[timer])
+        LLM_LATENCY.labels(model=self.model, backend=self.backend).observe(time.perf_counter() - started)
+        # Only streaming backends (Ollama) report tokens as they arrive
+        if timer.first_token_at is not None:
+            LLM_TTFT.labels(model=self.model, backend=self.backend).observe(timer.first_token_at - started)
+        return llm_result
+
+    def _run_ollama(self, text: str):
+        """
+        Отправляет промпт на бэкенд Ollama, предпочитая бэкенды с уже загруженной моделью.
+        """
+        resident = set()
+        try:
+            resident = get_resident_backends(self.model)
+        except Exception as e:
+            print(f"Failed to read model residency for {self.model}: {str(e)}")
+
+        with self.router.route(self.model, text, preferred=resident) as backend:
+            self.backend = backend
+            llm_result = self._generate(get_ollama_llm(self.model, backend), text)
+
+        try:
+            mark_resident(self.model, backend)
+        except Exception as e:
+            print(f"Failed to record model residency for {self.model}: {str(e)}")
+        return llm_result
+
+    def _extract_usage(self, llm_result, generation, prompt_text: str) -> dict:
+        """
+        Извлекает количество токенов из ответа бэкенда, с оценкой по длине текста
+        если бэкенд их не сообщил.
+        """
+        info = generation.generation_info or {}
+        token_usage = (llm_result.llm_output or {}).get("token_usage", {})
+        # Ollama reports eval counts per generation, OpenAI reports token_usage per call
+        prompt_tokens = info.get("prompt_eval_count") or token_usage.get("prompt_tokens")
+        completion_tokens = info.get("eval_count") or token_usage.get("completion_tokens")
+        return {
+            "model": self.model,
+            "backend": self.backend,
+            "prompt_tokens": prompt_tokens if prompt_tokens is not None else estimate_tokens(prompt_text),
+            "completion_tokens": completion_tokens if completion_tokens is not None else estimate_tokens(generation.text),
+            # Time Ollama spent loading the model for this call (cold start)
+            "load_ms": int(info["load_duration"] / 1e6) if info.get("load_duration") is not None else None,
+        }
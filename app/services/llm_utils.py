@@ -0,0 +1,31 @@
+# app/services/llm_utils.py
+# Small helpers shared by the worker, the API and the benchmarks.
+# Kept free of LLM imports and settings so that they can be used anywhere.
+
+import re
+
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+def estimate_tokens(text: str) -> int:
+    """
+    Грубая оценка числа токенов (~4 символа на токен) для бэкендов,
+    которые не возвращают статистику.
+    """
+    return max(1, len(text) // 4) if text else 0
+
+def parse_keep_alive(value: str) -> float:
+    """
+    Переводит keep_alive в формате Ollama ("30m", "1h", "300") в секунды.
+    Отрицательное значение означает "держать модель загруженной всегда".
+    """
+    value = str(value).strip()
+    if re.fullmatch(r"-?\d+(\.\d+)?", value):
+        return float(value)
+    total = 0.0
+    for amount, unit in re.findall(r"(-?\d+(?:\.\d+)?)(ms|s|m|h)", value):
+        total += float(amount) * _DURATION_UNITS[unit]
+    return total
+
+def normalize_model_name(model: str) -> str:
+    # Ollama reports resident models with an explicit tag
+    return model if ":" in model else f"{model}:latest"
@@ -0,0 +1,106 @@
+# app/services/model_manager.py
+# Model warm-up, keep-alive pings and residency tracking for Ollama backends
+
+import time
+from typing import Dict, List, Set
+import httpx
+from app.core.config import settings
+from app.services.routing import get_backends
+from app.services.llm_utils import normalize_model_name, parse_keep_alive
+from app.db.redis_client import get_sync_redis
+
+# Loading a large model from disk can take minutes on a cold host
+LOAD_TIMEOUT_SECONDS = 600
+
+def model_for_task(task_type: str) -> str:
+    return settings.TASK_MODELS.get(task_type, settings.LLM_MODEL)
+
+def configured_models() -> List[str]:
+    models = [settings.LLM_MODEL] + list(settings.TASK_MODELS.values())
+    return list(dict.fromkeys(models))
+
+def _resident_key(model: str) -> str:
+    return f"ollama_resident:{normalize_model_name(model)}"
+
+def _residency_ttl() -> float:
+    keep_alive = parse_keep_alive(settings.OLLAMA_KEEP_ALIVE)
+    # A negative keep_alive never unloads; re-check residency on the next ping anyway.
+    # Zero unloads the model right after the request, so it is never resident
+    return keep_alive if keep_alive >= 0 else max(settings.OLLAMA_KEEP_ALIVE_INTERVAL * 2, 3600)
+
+def mark_resident(model: str, backend: str, ttl: float = None):
+    """
+    Отмечает модель загруженной на бэкенде до истечения keep_alive.
+    """
+    ttl = ttl if ttl is not None else _residency_ttl()
+    if ttl <= 0:
+        return
+    expires_at = time.time() + ttl
+    key = _resident_key(model)
+    pipe = get_sync_redis().pipeline()
+    pipe.zadd(key, {backend: expires_at})
+    pipe.zremrangebyscore(key, "-inf", time.time())
+    pipe.execute()
+
+def get_resident_backends(model: str) -> Set[str]:
+    """
+    Бэкенды, на которых модель сейчас загружена.
+    """
+    return set(get_sync_redis().zrangebyscore(_resident_key(model), time.time(), "+inf"))
+
+def list_resident_models(backend: str) -> Dict[str, float]:
+    """
+    Модели, загруженные на бэкенде (GET /api/ps), и время их выгрузки.
+    """
+    response = httpx.get(f"{backend}/api/ps", timeout=10)
+    response.raise_for_status()
+    resident = {}
+    for item in response.json().get("models", []):
+        resident[item["name"]] = item.get("expires_at")
+    return resident
+
+def load_model(backend: str, model: str) -> float:
+    """
+    Загружает модель на бэкенд запросом без промпта и возвращает время загрузки в мс.
+    """
+    response = httpx.post(
+        f"{backend}/api/generate",
+        json={"model": model, "keep_alive": settings.OLLAMA_KEEP_ALIVE},
+        timeout=LOAD_TIMEOUT_SECONDS
+    )
+    response.raise_for_status()
+    mark_resident(model, backend)
+    return response.json().get("load_duration", 0) / 1e6
+
+def warm_up_backends():
+    """
+    Предзагрузка настроенных моделей на все бэкенды Ollama при старте воркера.
+    """
+    for backend in get_backends():
+        for model in configured_models():
+            try:
+                load_ms = load_model(backend, model)
+                print(f"Warmed up model {model} on {backend} in {load_ms:.0f} ms")
+            except Exception as e:
+                print(f"Failed to warm up model {model} on {backend}: {str(e)}")
+
+def keep_models_warm():
+    """
+    Периодический пинг: продлевает keep_alive настроенных моделей и
+    обновляет сведения о загруженных моделях.
+    """
+    for backend in get_backends():
+        try:
+            resident = list_resident_models(backend)
+        except Exception as e:
+            print(f"Failed to list models on {backend}: {str(e)}")
+            continue
+        for model in configured_models():
+            if normalize_model_name(model) not in resident:
+                # Only refresh models that are already loaded; reloading an
+                # evicted model is left to warm-up or the next real task
+                continue
+            try:
+                load_model(backend, model)
+            except Exception as e:
+                print(f"Failed to ping model {model} on {backend}: {str(e)}")
@@ -0,0 +1,23 @@
+# app/services/result_cache.py
+# Exact-match cache of LLM results keyed by model and rendered input
+
+import hashlib
+from typing import Optional
+from app.core.config import settings
+from app.db.redis_client import get_sync_redis
+
+def cache_key(namespace: str, model: str, text: str) -> str:
+    digest = hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+    return f"llm_cache:{namespace}:{digest}"
+
+def get_cached_result(namespace: str, model: str, text: str) -> Optional[str]:
+    """
+    Возвращает сохраненный результат для того же входа и модели, если он есть.
+    """
+    return get_sync_redis().get(cache_key(namespace, model, text))
+
+def set_cached_result(namespace: str, model: str, text: str, result: str):
+    """
+    Сохраняет результат на LLM_CACHE_TTL секунд.
+    """
+    get_sync_redis().set(cache_key(namespace, model, text), result, ex=settings.LLM_CACHE_TTL)
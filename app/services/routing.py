@@ -0,0 +1,182 @@
+# app/services/routing.py
+# Prompt-prefix aware routing across several Ollama backends
+
+import bisect
+import hashlib
+import itertools
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set
+from app.core.config import settings
+from app.db.redis_client import get_sync_redis
+
+def prompt_fingerprint(model: str, prompt: str, prefix_chars: int) -> str:
+    """
+    Отпечаток модели и начала промпта. Промпты с общим шаблоном и общей
+    преамбулой документа получают одинаковый отпечаток.
+    """
+    prefix = prompt[:prefix_chars]
+    return hashlib.sha256(f"{model}\0{prefix}".encode("utf-8")).hexdigest()
+
+def _hash(value: str) -> int:
+    return int(hashlib.md5(value.encode("utf-8")).hexdigest()[:16], 16)
+
+class InMemoryLoadTracker:
+    """
+    Счетчики задач в обработке для одного процесса.
+    """
+    def __init__(self, backends: List[str]):
+        self._lock = threading.Lock()
+        self._load = {backend: 0 for backend in backends}
+
+    def loads(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._load)
+
+    def acquire(self, backend: str):
+        with self._lock:
+            self._load[backend] += 1
+
+    def release(self, backend: str):
+        with self._lock:
+            self._load[backend] -= 1
+
+# Decrements a load counter without going below zero. The key may have expired
+# during a long call; a plain DECR would then leave -1 without a TTL and make
+# the backend look idle to the next acquire.
+RELEASE_SCRIPT = """
+local value = redis.call("DECR", KEYS[1])
+if value <= 0 then
+    redis.call("DEL", KEYS[1])
+    return 0
+end
+redis.call("EXPIRE", KEYS[1], ARGV[1])
+return value
+"""
+
+class RedisLoadTracker:
+    """
+    Счетчики задач в обработке, общие для всех воркеров.
+    """
+    # Guard against counters leaking if a worker dies mid-task
+    KEY_TTL_SECONDS = 600
+
+    def __init__(self, backends: List[str], client):
+        self.backends = backends
+        self.client = client
+        self._release = client.register_script(RELEASE_SCRIPT)
+
+    def _key(self, backend: str) -> str:
+        return f"backend_load:{backend}"
+
+    def loads(self) -> Dict[str, int]:
+        values = self.client.mget([self._key(b) for b in self.backends])
+        return {b: max(0, int(v or 0)) for b, v in zip(self.backends, values)}
+
+    def acquire(self, backend: str):
+        pipe = self.client.pipeline()
+        pipe.incr(self._key(backend))
+        pipe.expire(self._key(backend), self.KEY_TTL_SECONDS)
+        pipe.execute()
+
+    def release(self, backend: str):
+        self._release(keys=[self._key(backend)], args=[self.KEY_TTL_SECONDS])
+
+ROUTING_STRATEGIES = ("prefix", "least_loaded")
+
+class BackendRouter:
+    """
+    Стратегия prefix: консистентное хеширование отпечатка промпта на кольце
+    бэкендов с ограничением нагрузки: если "свой" бэкенд перегружен, запрос
+    уходит на следующий по кольцу.
+    Стратегия least_loaded: наименее нагруженный бэкенд, без учета промпта.
+    """
+    def __init__(self, backends: List[str], load_tracker=None, replicas: int = 100,
+                 load_factor: float = 1.25, prefix_chars: int = 256, strategy: str = "prefix"):
+        if not backends:
+            raise ValueError("At least one backend is required")
+        if strategy not in ROUTING_STRATEGIES:
+            raise ValueError(f"Unknown routing strategy: {strategy}")
+        self.backends = list(backends)
+        self.load_tracker = load_tracker or InMemoryLoadTracker(self.backends)
+        self.load_factor = load_factor
+        self.prefix_chars = prefix_chars
+        self.strategy = strategy
+        # Rotates the order of equally loaded backends under least_loaded
+        self._turn = itertools.count()
+        self._ring = sorted(
+            (_hash(f"{backend}#{i}"), backend)
+            for backend in self.backends
+            for i in range(replicas)
+        )
+        self._ring_keys = [point for point, _ in self._ring]
+
+    def _candidates(self, fingerprint: str) -> List[str]:
+        """
+        Бэкенды в порядке обхода кольца, начиная с точки отпечатка.
+        """
+        start = bisect.bisect(self._ring_keys, _hash(fingerprint))
+        ordered = []
+        for i in range(len(self._ring)):
+            backend = self._ring[(start + i) % len(self._ring)][1]
+            if backend not in ordered:
+                ordered.append(backend)
+                if len(ordered) == len(self.backends):
+                    break
+        return ordered
+
+    def _rotation(self) -> List[str]:
+        start = next(self._turn) % len(self.backends)
+        return self.backends[start:] + self.backends[:start]
+
+    def choose(self, model: str, prompt: str, preferred: Optional[Set[str]] = None) -> str:
+        """
+        Выбирает бэкенд для промпта. Бэкенды из preferred (например, с уже
+        загруженной моделью) рассматриваются первыми.
+        """
+        if self.strategy == "least_loaded":
+            candidates = self._rotation()
+        else:
+            candidates = self._candidates(prompt_fingerprint(model, prompt, self.prefix_chars))
+        if preferred:
+            candidates = sorted(candidates, key=lambda b: b not in preferred)
+        if len(candidates) == 1:
+            return candidates[0]
+        loads = self.load_tracker.loads()
+        if self.strategy == "least_loaded":
+            # Preferred backends come first, so they win ties
+            return min(candidates, key=lambda b: loads.get(b, 0))
+        # Bounded loads: no backend takes more than load_factor x the average
+        capacity = self.load_factor * (sum(loads.values()) + 1) / len(self.backends)
+        for backend in candidates:
+            if loads.get(backend, 0) + 1 <= capacity:
+                return backend
+        return min(candidates, key=lambda b: loads.get(b, 0))
+
+    @contextmanager
+    def route(self, model: str, prompt: str, preferred: Optional[Set[str]] = None):
+        backend = self.choose(model, prompt, preferred)
+        self.load_tracker.acquire(backend)
+        try:
+            yield backend
+        finally:
+            self.load_tracker.release(backend)
+
+def get_backends() -> List[str]:
+    backends = [url.strip() for url in settings.OLLAMA_BASE_URLS.split(",") if url.strip()]
+    return backends or [settings.OLLAMA_BASE_URL]
+
+_router = None
+
+def get_router() -> BackendRouter:
+    global _router
+    if _router is None:
+        backends = get_backends()
+        _router = BackendRouter(
+            backends,
+            load_tracker=RedisLoadTracker(backends, get_sync_redis()),
+            load_factor=settings.ROUTING_LOAD_FACTOR,
+            prefix_chars=settings.PREFIX_ROUTING_CHARS,
+            strategy=settings.ROUTING_STRATEGY
+        )
+    return _router
@@ -0,0 +1,224 @@
+# app/services/semantic_cache.py
+# Optional embedding-based cache of LLM results for near-duplicate prompts
+
+import difflib
+import re
+import threading
+import zlib
+from typing import Dict, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+
+_PUNCT_RE = re.compile(r"[^\w\s]", re.UNICODE)
+_SPACE_RE = re.compile(r"\s+")
+# Shorter words are only accepted unchanged by the typo verification
+TYPO_MIN_WORD_LENGTH = 4
+
+def normalize_text(text: str) -> str:
+    """
+    Приводит текст к нижнему регистру и убирает пунктуацию и лишние пробелы.
+    """
+    text = _PUNCT_RE.sub(" ", text.lower())
+    return _SPACE_RE.sub(" ", text).strip()
+
+def _one_edit(a: str, b: str) -> bool:
+    # One substitution, insertion, deletion or swap of adjacent characters
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diff = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(diff) == 1:
+            return True
+        return (len(diff) == 2 and diff[1] == diff[0] + 1
+                and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]])
+    shorter, longer = sorted((a, b), key=len)
+    i = 0
+    while i < len(shorter) and shorter[i] == longer[i]:
+        i += 1
+    return shorter[i:] == longer[i + 1:]
+
+def _is_typo(a: str, b: str) -> bool:
+    if any(ch.isdigit() for ch in a + b):
+        # Numbers change the meaning of a request, they must match exactly
+        return False
+    if min(len(a), len(b)) < TYPO_MIN_WORD_LENGTH:
+        # One letter changes most short words into other words
+        return False
+    if a[0] != b[0] or a[-1] != b[-1]:
+        # Edits at the ends of a word add or drop prefixes and endings: im-, dis-, -ed, -s, -t
+        return False
+    return _one_edit(a[1:-1], b[1:-1])
+
+def is_trivial_edit(a: str, b: str) -> bool:
+    """
+    Проверяет, что нормализованные тексты отличаются только опечатками:
+    каждое отличающееся слово заменено словом той же длины +-1 с одной правкой
+    внутри слова (замена, вставка, удаление или перестановка соседних букв).
+    """
+    words_a, words_b = a.split(), b.split()
+    matcher = difflib.SequenceMatcher(None, words_a, words_b, autojunk=False)
+    for op, a1, a2, b1, b2 in matcher.get_opcodes():
+        if op == "equal":
+            continue
+        if op != "replace" or a2 - a1 != b2 - b1:
+            return False
+        if not all(_is_typo(x, y) for x, y in zip(words_a[a1:a2], words_b[b1:b2])):
+            return False
+    return True
+
+def matches(candidate: str, normalized: str, mode: str) -> bool:
+    """
+    Решает, можно ли отдать результат кандидата для запроса (оба текста
+    нормализованы): exact - только совпадение после нормализации,
+    typo - отличия только опечатками, similarity - решает один порог сходства.
+    """
+    if mode == "exact":
+        return candidate == normalized
+    if mode == "typo":
+        return is_trivial_edit(candidate, normalized)
+    return True
+
+def _ngram_ids(text: str, dim: int) -> Tuple[np.ndarray, np.ndarray]:
+    words = text.split()
+    grams = list(words)
+    grams.extend(f"{a} {b}" for a, b in zip(words, words[1:]))
+    padded = f" {text} "
+    grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint32, count=len(grams))
+    # The top bit picks the sign so that hash collisions cancel out on average
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+    return (hashes % dim).astype(np.int64), signs
+
+def embed(text: str, dim: int) -> np.ndarray:
+    """
+    Вектор хешированных n-грамм (слова, пары слов, символьные триграммы),
+    нормированный по L2. Не требует модели и работает на CPU.
+    """
+    return _embed_normalized(normalize_text(text), dim)
+
+def _embed_normalized(normalized: str, dim: int) -> np.ndarray:
+    if not normalized:
+        return np.zeros(dim, dtype=np.float32)
+    ids, signs = _ngram_ids(normalized, dim)
+    vector = np.bincount(ids, weights=signs, minlength=dim).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class SemanticIndex:
+    """
+    Ограниченный по размеру индекс векторов с поиском ближайшего соседа
+    полным скалярным произведением и вытеснением давно не использованных записей.
+    """
+    # Storage grows geometrically up to capacity instead of being preallocated
+    INITIAL_SLOTS = 64
+
+    def __init__(self, dim: int, capacity: int):
+        self.capacity = capacity
+        slots = min(capacity, self.INITIAL_SLOTS)
+        self.vectors = np.zeros((slots, dim), dtype=np.float32)
+        self.last_used = np.zeros(slots, dtype=np.int64)
+        self.results = []
+        self.texts = []
+        self.size = 0
+        self._clock = 0
+
+    def _grow(self):
+        slots = min(self.capacity, len(self.vectors) * 2)
+        vectors = np.zeros((slots, self.vectors.shape[1]), dtype=np.float32)
+        vectors[:self.size] = self.vectors[:self.size]
+        last_used = np.zeros(slots, dtype=np.int64)
+        last_used[:self.size] = self.last_used[:self.size]
+        self.vectors, self.last_used = vectors, last_used
+
+    def search(self, vector: np.ndarray) -> Tuple[Optional[int], float]:
+        if self.size == 0:
+            return None, 0.0
+        scores = self.vectors[:self.size] @ vector
+        best = int(np.argmax(scores))
+        return best, float(scores[best])
+
+    def touch(self, slot: int):
+        self._clock += 1
+        self.last_used[slot] = self._clock
+
+    def add(self, vector: np.ndarray, text: str, result: str):
+        if self.size < self.capacity:
+            if self.size == len(self.vectors):
+                self._grow()
+            slot = self.size
+            self.size += 1
+            self.results.append(result)
+            self.texts.append(text)
+        else:
+            slot = int(np.argmin(self.last_used))
+            self.results[slot] = result
+            self.texts[slot] = text
+        self.vectors[slot] = vector
+        self.touch(slot)
+
+class SemanticCache:
+    """
+    Семантический кэш результатов: отдельный индекс на каждую пару
+    (тип задачи, модель). Ближайший кандидат выше порога дополнительно
+    проверяется по режиму match (см. matches).
+    """
+    def __init__(self, threshold: float, capacity: int, dim: int, match: str = "exact"):
+        self.threshold = threshold
+        self.match = match
+        self.capacity = capacity
+        self.dim = dim
+        self.hits = 0
+        self.misses = 0
+        self._indexes: Dict[Tuple[str, str], SemanticIndex] = {}
+        self._lock = threading.Lock()
+
+    def _index(self, task_type: str, model: str) -> SemanticIndex:
+        key = (task_type, model)
+        if key not in self._indexes:
+            self._indexes[key] = SemanticIndex(self.dim, self.capacity)
+        return self._indexes[key]
+
+    def lookup(self, task_type: str, model: str, prompt: str) -> Tuple[Optional[str], float]:
+        """
+        Возвращает ближайший сохраненный результат и его сходство,
+        или (None, сходство), если сходство ниже порога.
+        """
+        normalized = normalize_text(prompt)
+        vector = _embed_normalized(normalized, self.dim)
+        with self._lock:
+            index = self._index(task_type, model)
+            slot, score = index.search(vector)
+            if (slot is None or score < self.threshold
+                    or not matches(index.texts[slot], normalized, self.match)):
+                self.misses += 1
+                return None, score
+            index.touch(slot)
+            self.hits += 1
+            return index.results[slot], score
+
+    def get(self, task_type: str, model: str, prompt: str) -> Optional[str]:
+        return self.lookup(task_type, model, prompt)[0]
+
+    def put(self, task_type: str, model: str, prompt: str, result: str):
+        normalized = normalize_text(prompt)
+        vector = _embed_normalized(normalized, self.dim)
+        with self._lock:
+            self._index(task_type, model).add(vector, normalized, result)
+
+_cache = None
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """
+    Кэш процесса или None, если семантический кэш выключен.
+    """
+    global _cache
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = SemanticCache(
+            threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+            capacity=settings.SEMANTIC_CACHE_SIZE,
+            dim=settings.SEMANTIC_CACHE_DIM,
+            match=settings.SEMANTIC_CACHE_MATCH
+        )
+    return _cache
@@ -0,0 +1,113 @@
+# app/services/summarization.py
+# Chunking helpers for hierarchical map-reduce summarization of long documents
+
+import hashlib
+import re
+from typing import List, Optional, Tuple
+from app.services.llm_utils import estimate_tokens
+
+MAP_TEMPLATE = "Summarize the following part of a larger document, keeping all key facts:\n{text}"
+REDUCE_TEMPLATE = "Combine the following partial summaries of one document into a single coherent summary:\n{text}"
+SUMMARY_SEPARATOR = "\n\n"
+
+# A paragraph whose hash is divisible by this closes its chunk early, so chunk
+# boundaries re-synchronize shortly after an edit instead of shifting for the
+# rest of the document.
+ANCHOR_MODULUS = 4
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_WORD_RE = re.compile(r"\S+\s*")
+
+def needs_chunking(text: str, chunk_tokens: int) -> bool:
+    return estimate_tokens(text) > chunk_tokens
+
+def _split_long_paragraph(paragraph: str, chunk_tokens: int) -> List[str]:
+    """
+    Режет абзац, не помещающийся в один кусок, по границам слов.
+    """
+    pieces, current = [], ""
+    for word in _WORD_RE.findall(paragraph):
+        if current and estimate_tokens(current + word) > chunk_tokens:
+            pieces.append(current.strip())
+            current = ""
+        current += word
+    if current.strip():
+        pieces.append(current.strip())
+    return pieces
+
+def _is_anchor(paragraph: str) -> bool:
+    digest = hashlib.md5(paragraph.encode("utf-8")).digest()
+    return digest[0] % ANCHOR_MODULUS == 0
+
+def split_into_chunks(text: str, chunk_tokens: int) -> List[str]:
+    """
+    Делит текст на куски не длиннее chunk_tokens по границам абзацев и слов.
+    Границы определяются содержимым, поэтому правка одного абзаца меняет
+    только ближайшие куски, а остальные берутся из кэша.
+    """
+    paragraphs = []
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) > chunk_tokens:
+            paragraphs.extend(_split_long_paragraph(paragraph, chunk_tokens))
+        else:
+            paragraphs.append(paragraph)
+
+    chunks, current = [], []
+    for paragraph in paragraphs:
+        candidate = SUMMARY_SEPARATOR.join(current + [paragraph])
+        if current and estimate_tokens(candidate) > chunk_tokens:
+            chunks.append(SUMMARY_SEPARATOR.join(current))
+            current = []
+        current.append(paragraph)
+        if _is_anchor(paragraph) and estimate_tokens(SUMMARY_SEPARATOR.join(current)) >= chunk_tokens // 2:
+            chunks.append(SUMMARY_SEPARATOR.join(current))
+            current = []
+    if current:
+        chunks.append(SUMMARY_SEPARATOR.join(current))
+    return chunks
+
+def group_for_reduce(summaries: List[str], chunk_tokens: int, fanin: int) -> List[List[str]]:
+    """
+    Группирует частичные резюме для следующего уровня свертки: не больше
+    fanin резюме и chunk_tokens токенов в группе. Групп всегда меньше,
+    чем резюме, поэтому свертка завершается за конечное число уровней.
+    """
+    groups, current = [], []
+    for summary in summaries:
+        candidate = SUMMARY_SEPARATOR.join(current + [summary])
+        if current and (len(current) >= fanin or estimate_tokens(candidate) > chunk_tokens):
+            groups.append(current)
+            current = []
+        current.append(summary)
+    if current:
+        groups.append(current)
+    if len(groups) == len(summaries) > 1:
+        # Every summary is too long to share a group: merge pairs regardless of
+        # the token budget so the next level still has fewer summaries
+        groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+    return groups
+
+def plan_reduce(summaries: List[str], chunk_tokens: int, fanin: int) -> Optional[Tuple[List[str], List[Optional[str]]]]:
+    """
+    Следующий уровень свертки: тексты групп для LLM и carried - резюме уровня
+    по порядку, где None отмечает места результатов. Резюме, оставшееся в
+    группе одно, переходит дальше без изменений. None, если резюме одно.
+    """
+    if len(summaries) == 1:
+        return None
+    groups = group_for_reduce(summaries, chunk_tokens, fanin)
+    texts = [SUMMARY_SEPARATOR.join(g) for g in groups if len(g) > 1]
+    carried = [g[0] if len(g) == 1 else None for g in groups]
+    return texts, carried
+
+def merge_carried(carried: Optional[List[Optional[str]]], reduced: List[str]) -> List[str]:
+    """
+    Резюме уровня по порядку: перенесенные без изменений и свернутые на месте None.
+    """
+    if not carried:
+        return list(reduced)
+    reduced = iter(reduced)
+    return [summary if summary is not None else next(reduced) for summary in carried]
@@ -0,0 +1,144 @@
+# app/services/task_cache.py
+# Read-through cache of task records: an in-process LRU in front of Redis
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from app.core.config import settings
+from app.core.metrics import record_cache
+from app.db.models import TaskStatus
+from app.schemas.tasks import TaskResponse
+from app.db.redis_client import get_async_redis, get_sync_redis
+
+# Tasks in these states never change again (the worker only commits FAILED after the last retry)
+TERMINAL_STATUSES = (TaskStatus.COMPLETED.value, TaskStatus.FAILED.value)
+
+def task_cache_key(task_id) -> str:
+    return f"task:{task_id}"
+
+class CachedTask:
+    """
+    Сериализованная запись задания и ее ETag.
+    """
+    def __init__(self, body: str):
+        self.body = body
+        self.etag = '"' + hashlib.md5(body.encode("utf-8")).hexdigest() + '"'
+        data = json.loads(body)
+        self.user_id = data["user_id"]
+        self.status = data["status"]
+
+    @property
+    def terminal(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    @classmethod
+    def from_task(cls, task) -> "CachedTask":
+        return cls(TaskResponse.model_validate(task).model_dump_json())
+
+class LocalLRU:
+    """
+    Небольшой LRU-кэш процесса с ограничением времени жизни записей.
+    """
+    def __init__(self, size: int):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedTask]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: CachedTask, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+_local = LocalLRU(settings.TASK_CACHE_LOCAL_SIZE)
+
+def _redis_ttl(cached: CachedTask) -> Optional[int]:
+    if cached.terminal:
+        return settings.TASK_CACHE_TERMINAL_TTL or None
+    return settings.TASK_CACHE_INFLIGHT_TTL
+
+def _local_ttl(cached: CachedTask) -> float:
+    # Other processes cannot invalidate this copy, so it is always bounded
+    if cached.terminal:
+        return settings.TASK_CACHE_LOCAL_TTL
+    return min(settings.TASK_CACHE_INFLIGHT_TTL, settings.TASK_CACHE_LOCAL_TTL)
+
+async def get_cached_task(task_id) -> Optional[CachedTask]:
+    """
+    Ищет задание в кэше процесса, затем в Redis.
+    """
+    if not settings.TASK_CACHE_ENABLED:
+        return None
+    key = task_cache_key(task_id)
+    cached = _local.get(key)
+    record_cache("task_local", cached is not None)
+    if cached is not None:
+        return cached
+    try:
+        body = await get_async_redis().get(key)
+    except Exception as e:
+        print(f"Failed to read task {task_id} from cache: {str(e)}")
+        return None
+    record_cache("task_redis", body is not None)
+    if body is None:
+        return None
+    cached = CachedTask(body)
+    _local.set(key, cached, _local_ttl(cached))
+    return cached
+
+async def cache_task(task) -> CachedTask:
+    """
+    Кэширует запись, прочитанную из БД. Не перезаписывает запись,
+    которую воркер успел сохранить после чтения из БД.
+    """
+    cached = CachedTask.from_task(task)
+    if not settings.TASK_CACHE_ENABLED:
+        return cached
+    key = task_cache_key(task.id)
+    try:
+        await get_async_redis().set(key, cached.body, ex=_redis_ttl(cached), nx=True)
+    except Exception as e:
+        print(f"Failed to cache task {task.id}: {str(e)}")
+    _local.set(key, cached, _local_ttl(cached))
+    return cached
+
+def store_task(task):
+    """
+    Обновляет запись задания после смены статуса (вызывается воркером).
+    """
+    if not settings.TASK_CACHE_ENABLED:
+        return
+    try:
+        cached = CachedTask.from_task(task)
+        get_sync_redis().set(task_cache_key(task.id), cached.body, ex=_redis_ttl(cached))
+    except Exception as e:
+        print(f"Failed to update cached task {task.id}: {str(e)}")
+
+async def invalidate_task(task_id):
+    _local.delete(task_cache_key(task_id))
+    if not settings.TASK_CACHE_ENABLED:
+        return
+    try:
+        await get_async_redis().delete(task_cache_key(task_id))
+    except Exception as e:
+        print(f"Failed to invalidate cached task {task_id}: {str(e)}")
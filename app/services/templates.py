@@ -0,0 +1,8 @@
+# app/services/templates.py
+# Prompt templates of the LLM task types.
+# Kept free of LLM imports so that the API can validate task types.
+
+TASK_TEMPLATES = {
+    "summarization": "Summarize the following text:\n{text}",
+    "translation": "Translate the following text to English:\n{text}",
+}
@@ -0,0 +1,65 @@
+# app/services/usage.py
+# Rolling per-user usage counters in Redis and quota checks
+
+import time
+from app.core.config import settings
+from app.db.redis_client import get_sync_redis, get_async_redis
+
+# Counters are kept in hourly buckets; the rolling window is the sum of the
+# last QUOTA_WINDOW_HOURS buckets.
+BUCKET_SECONDS = 3600
+
+def _bucket_key(user_id, bucket: int) -> str:
+    return f"usage:{user_id}:{bucket}"
+
+def _window_keys(user_id, now: float = None):
+    current = int((now or time.time()) // BUCKET_SECONDS)
+    return [_bucket_key(user_id, current - i) for i in range(settings.QUOTA_WINDOW_HOURS)]
+
+def _increment(pipe, user_id, field: str, amount: int):
+    key = _bucket_key(user_id, int(time.time() // BUCKET_SECONDS))
+    pipe.hincrby(key, field, amount)
+    # Keep each bucket one hour longer than the window it contributes to
+    pipe.expire(key, (settings.QUOTA_WINDOW_HOURS + 1) * BUCKET_SECONDS)
+
+def record_usage(user_id, tokens: int):
+    """
+    Добавляет израсходованные токены к счетчику пользователя (вызывается из воркера).
+    """
+    pipe = get_sync_redis().pipeline()
+    _increment(pipe, user_id, "tokens", tokens)
+    pipe.execute()
+
+async def record_submission(user_id):
+    """
+    Учитывает новое задание пользователя в скользящем окне.
+    """
+    pipe = get_async_redis().pipeline()
+    _increment(pipe, user_id, "tasks", 1)
+    await pipe.execute()
+
+async def get_user_usage(user_id) -> dict:
+    """
+    Возвращает количество токенов и заданий пользователя за скользящее окно.
+    """
+    pipe = get_async_redis().pipeline()
+    for key in _window_keys(user_id):
+        pipe.hgetall(key)
+    buckets = await pipe.execute()
+    return {
+        "tokens": sum(int(b.get("tokens", 0)) for b in buckets),
+        "tasks": sum(int(b.get("tasks", 0)) for b in buckets),
+    }
+
+async def is_over_quota(user_id) -> bool:
+    """
+    Проверяет, превысил ли пользователь квоту по токенам или заданиям.
+    """
+    if not settings.USER_TOKEN_QUOTA and not settings.USER_TASK_QUOTA:
+        return False
+    usage = await get_user_usage(user_id)
+    if settings.USER_TOKEN_QUOTA and usage["tokens"] >= settings.USER_TOKEN_QUOTA:
+        return True
+    if settings.USER_TASK_QUOTA and usage["tasks"] >= settings.USER_TASK_QUOTA:
+        return True
+    return False
@@ -0,0 +1,52 @@
+# app/services/workflow.py
+# Multi-step workflow tasks: a small DAG of LLM task types run inside one Task.
+# Kept free of LLM imports so that the API can validate specs.
+
+from typing import Dict, List
+from app.services.templates import TASK_TEMPLATES
+
+WORKFLOW_TASK_TYPE = "workflow"
+# Joins the outputs of several dependencies into the input of the next step
+STEP_SEPARATOR = "\n\n"
+
+def workflow_levels(steps: List[dict]) -> List[List[dict]]:
+    """
+    Раскладывает шаги по уровням: шаги одного уровня не зависят друг от друга
+    и выполняются параллельно, каждый уровень зависит только от предыдущих.
+    Бросает ValueError для пустого списка, повторных id, неизвестных типов задач,
+    неизвестных зависимостей и циклов.
+    """
+    if not steps:
+        raise ValueError("Workflow must contain at least one step")
+    by_id = {}
+    for step in steps:
+        if step["id"] in by_id:
+            raise ValueError(f"Duplicate workflow step id: {step['id']}")
+        # Only LLMService task types can be steps; this also rules out nested workflows
+        if step["task_type"] not in TASK_TEMPLATES:
+            raise ValueError(f"Unknown task type of step {step['id']}: {step['task_type']}")
+        by_id[step["id"]] = step
+    for step in steps:
+        for dependency in step["after"]:
+            if dependency not in by_id:
+                raise ValueError(f"Step {step['id']} depends on unknown step {dependency}")
+
+    levels, placed = [], set()
+    while len(placed) < len(steps):
+        # Steps keep their order from the spec within a level
+        level = [step for step in steps
+                 if step["id"] not in placed and all(d in placed for d in step["after"])]
+        if not level:
+            raise ValueError("Workflow steps contain a dependency cycle")
+        placed.update(step["id"] for step in level)
+        levels.append(level)
+    return levels
+
+def step_input(step: dict, prompt: str, outputs: Dict[str, str]) -> str:
+    """
+    Вход шага: промпт задания для шагов без зависимостей, иначе результаты
+    зависимостей в порядке их перечисления.
+    """
+    if not step["after"]:
+        return prompt
+    return STEP_SEPARATOR.join(outputs[dependency] for dependency in step["after"])
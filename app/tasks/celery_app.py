@@ -0,0 +1,55 @@
+# app/tasks/celery_app.py
+# Celery application shared by the API (publishing) and the worker (consuming).
+# Kept free of LLM imports so that the API does not load LangChain.
+
+import time
+from celery import Celery
+from celery.signals import before_task_publish
+from app.core.config import settings
+from app.core.tracing import current_traceparent
+
+# Инициализация Celery
+celery_app = Celery(
+    "tasks",
+    broker=settings.CELERY_BROKER_URL,
+    backend=settings.CELERY_RESULT_BACKEND,
+    # Task definitions are only loaded by the worker
+    include=["app.tasks.celery_worker"]
+)
+celery_app.conf.update(
+    task_serializer='json',
+    result_serializer='json',
+    accept_content=['json'],
+    timezone='Europe/Moscow',
+    enable_utc=True,
+    # Honour per-message priority so over-quota users can be de-prioritized
+    broker_transport_options={
+        "priority_steps": list(range(10)),
+        "sep": ":",
+        "queue_order_strategy": "priority",
+    },
+)
+
+# Периодические пинги keep-alive (требуется запущенный celery beat)
+if settings.LLM_PROVIDER != "openai" and settings.OLLAMA_KEEP_ALIVE_INTERVAL > 0:
+    celery_app.conf.beat_schedule = {
+        "keep-ollama-models-warm": {
+            "task": "app.tasks.celery_worker.keep_models_warm_task",
+            "schedule": settings.OLLAMA_KEEP_ALIVE_INTERVAL,
+        },
+    }
+
+# Трассировка: контекст передается в заголовках сообщений Celery
+
+@before_task_publish.connect
+def inject_trace_context(headers=None, **kwargs):
+    traceparent = current_traceparent()
+    if traceparent and headers is not None:
+        headers["traceparent"] = traceparent
+
+# Время публикации: по нему воркер считает время ожидания в очереди
+
+@before_task_publish.connect
+def stamp_publish_time(headers=None, **kwargs):
+    if headers is not None:
+        headers["published_at"] = time.time()
@@ -1,22 +1,130 @@
-from celery import Celery
+import json
+import threading
+import time
+from datetime import datetime
+from celery import chord, group
+from celery.signals import worker_ready, worker_process_shutdown, task_prerun, task_postrun
 from app.core.config import settings
-from app.db.session import sync_engine
+from app.core.tracing import start_span, activate, deactivate, parse_traceparent
+from app.core.metrics import (
+    QUEUE_WAIT, TASKS_IN_FLIGHT, record_cache, start_worker_metrics_server, mark_process_dead
+)
+from app.db.session import get_sync_engine
 from app.db.models import Task, TaskStatus
 from app.services.llm_service import LLMService
+from app.services.usage import record_usage
+from app.services.model_manager import warm_up_backends, keep_models_warm, model_for_task
+from app.services.result_cache import get_cached_result, set_cached_result
+from app.services.task_cache import store_task
+from app.services.summarization import (
+    MAP_TEMPLATE, REDUCE_TEMPLATE,
+    needs_chunking, split_into_chunks, plan_reduce, merge_carried
+)
+from app.services.workflow import WORKFLOW_TASK_TYPE, workflow_levels, step_input
+from app.tasks.celery_app import celery_app
 from sqlalchemy.orm import sessionmaker
 
-# Create a synchronous session for Celery
-SyncSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
-
-# Инициализация Celery
-celery_app = Celery("tasks", broker=settings.CELERY_BROKER_URL, backend=settings.CELERY_RESULT_BACKEND)
-celery_app.conf.update(
-    task_serializer='json',
-    result_serializer='json',
-    accept_content=['json'],
-    timezone='Europe/Moscow',
-    enable_utc=True,
-)
+# Create a synchronous session for Celery.
+# Committed tasks are not expired so that they can be cached without re-reading them.
+SyncSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=get_sync_engine())
+
+def _commit_task(db, task):
+    """
+    Сохраняет смену статуса задания и обновляет его запись в кэше.
+    """
+    db.commit()
+    store_task(task)
+
+# Метрики воркера
+
+@worker_ready.connect
+def start_metrics_exporter(**kwargs):
+    if settings.WORKER_METRICS_PORT:
+        start_worker_metrics_server(settings.WORKER_METRICS_PORT)
+
+@worker_process_shutdown.connect
+def cleanup_process_metrics(pid=None, **kwargs):
+    mark_process_dead(pid)
+
+@task_prerun.connect
+def track_task_start(task=None, task_id=None, **kwargs):
+    TASKS_IN_FLIGHT.labels(task=task.name).inc()
+    _record_queue_wait(task)
+    # Continue the trace of whoever published the task (API request or parent task)
+    trace_span = start_span(task.name, parent=parse_traceparent(task.request.get("traceparent")),
+                            attributes={"celery.task_id": task_id})
+    task.request.trace_span = trace_span
+    task.request.trace_token = activate(trace_span)
+
+def _record_queue_wait(task):
+    """
+    Время ожидания в очереди для подзадач (части документа, шаги workflow,
+    обратные вызовы chord) по времени публикации сообщения.
+    """
+    published_at = task.request.get("published_at")
+    # process_llm_task records it per task type itself. A retry is published with a
+    # countdown, so only the first attempt measures the queue
+    if task.name == process_llm_task.name or published_at is None or task.request.retries:
+        return
+    QUEUE_WAIT.labels(task_type=task.name.rsplit(".", 1)[-1]).observe(max(0.0, time.time() - published_at))
+
+@task_postrun.connect
+def track_task_end(task=None, state=None, **kwargs):
+    TASKS_IN_FLIGHT.labels(task=task.name).dec()
+    trace_span = task.request.get("trace_span")
+    if trace_span is not None:
+        trace_span.set_attribute("celery.state", state)
+        deactivate(task.request.trace_token)
+        trace_span.end()
+
+@worker_ready.connect
+def preload_models(**kwargs):
+    """
+    Предзагрузка моделей при старте воркера, чтобы первая задача не ждала загрузки.
+    """
+    if settings.LLM_PROVIDER == "openai" or not settings.OLLAMA_WARMUP_ON_START:
+        return
+    # Loading can take minutes; do not hold up the worker's startup
+    threading.Thread(target=warm_up_backends, daemon=True).start()
+
+@celery_app.task
+def keep_models_warm_task():
+    """
+    Продлевает keep_alive загруженных моделей на всех бэкендах Ollama.
+    """
+    keep_models_warm()
+
+def _complete_task(db, task, result: str, usage: dict):
+    """
+    Сохраняет результат задания и статистику использования.
+    """
+    task.result = result
+    task.status = TaskStatus.COMPLETED
+    task.model = usage.get("model")
+    task.backend = usage.get("backend")
+    task.prompt_tokens = usage.get("prompt_tokens")
+    task.completion_tokens = usage.get("completion_tokens")
+    task.load_ms = usage.get("load_ms")
+    task.completed_at = datetime.utcnow()
+    if task.started_at:
+        task.duration_ms = int((task.completed_at - task.started_at).total_seconds() * 1000)
+    _commit_task(db, task)
+
+    try:
+        record_usage(task.user_id, (task.prompt_tokens or 0) + (task.completion_tokens or 0))
+    except Exception as e:
+        print(f"Failed to record usage for task {task.id}: {str(e)}")
+
+def _add_usage(usage: dict, item: dict):
+    """
+    Добавляет расход одной части или шага к общему расходу задания.
+    """
+    usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + item["prompt_tokens"]
+    usage["completion_tokens"] = usage.get("completion_tokens", 0) + item["completion_tokens"]
+    usage["model"] = item.get("model") or usage.get("model")
+    usage["backend"] = item.get("backend") or usage.get("backend")
+
+PROCESS_MAX_RETRIES = 3
 
 @celery_app.task(bind=True)
 def process_llm_task(self, task_id: str):
@@ -33,24 +141,250 @@ def process_llm_task(self, task_id: str):
 
         # Обновляем статус на "в процессе"
         task.status = TaskStatus.IN_PROGRESS
-        db.commit()
+        task.started_at = datetime.utcnow()
+        _commit_task(db, task)
+        # Later attempts would add the earlier ones and the retry countdown to the wait
+        if task.created_at and not self.request.retries:
+            QUEUE_WAIT.labels(task_type=task.task_type).observe((task.started_at - task.created_at).total_seconds())
+
+        # Длинные документы суммируются по частям на нескольких воркерах
+        if task.task_type == "summarization" and needs_chunking(task.prompt, settings.SUMMARY_CHUNK_TOKENS):
+            chunks = split_into_chunks(task.prompt, settings.SUMMARY_CHUNK_TOKENS)
+            _start_summary_level(task_id, chunks, MAP_TEMPLATE, {})
+            return None
+
+        # Workflow: шаги выполняются по уровням DAG, независимые шаги параллельно
+        if task.task_type == WORKFLOW_TASK_TYPE:
+            _start_workflow_level(task_id, json.loads(task.workflow), 0, task.prompt, {}, {})
+            return None
 
         # Инициализация сервиса и запуск задачи
         llm_service = LLMService()  # Updated to use new constructor without API key
         result = llm_service.run_task(task_type=task.task_type, prompt=task.prompt)
 
-        # Обновляем статус и результат
-        task.result = result
-        task.status = TaskStatus.COMPLETED
-        db.commit()
-
+        # Обновляем статус, результат и статистику использования
+        _complete_task(db, task, result, llm_service.last_usage)
         return result
 
     except Exception as e:
         if task:
-            task.status = TaskStatus.FAILED
+            # A task that will be retried goes back to the queue; it fails for good
+            # (and is cached as terminal) only after its last attempt
+            retrying = self.request.retries < PROCESS_MAX_RETRIES
+            task.status = TaskStatus.PENDING if retrying else TaskStatus.FAILED
             task.result = str(e)
-            db.commit()
-        self.retry(exc=e, countdown=60, max_retries=3) # Повтор задачи при ошибке
+            _commit_task(db, task)
+        self.retry(exc=e, countdown=60, max_retries=PROCESS_MAX_RETRIES) # Повтор задачи при ошибке
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Иерархическая map-reduce суммаризация
+
+def _start_summary_level(task_id: str, texts, template: str, usage: dict, carried=None):
+    """
+    Запускает параллельную суммаризацию частей; результат собирает reduce_summaries.
+    carried - резюме уровня по порядку: готовые переходят дальше без изменений,
+    None отмечает места результатов texts.
+    """
+    header = group(summarize_chunk.s(text, template) for text in texts)
+    callback = reduce_summaries.s(task_id, usage, carried)
+    callback.on_error(fail_chord_task.s(task_id))
+    chord(header)(callback)
+
+@celery_app.task(autoretry_for=(Exception,), retry_backoff=True, max_retries=3)
+def summarize_chunk(text: str, template: str) -> dict:
+    """
+    Суммаризация одной части документа. Результаты кэшируются по содержимому,
+    поэтому после правки документа пересчитываются только измененные части.
+    """
+    model = model_for_task("summarization")
+    try:
+        cached = get_cached_result("summary", model, template + text)
+    except Exception as e:
+        print(f"Failed to read chunk cache: {str(e)}")
+        cached = None
+    record_cache("summary_chunk", cached is not None)
+    if cached is not None:
+        return {"summary": cached, "prompt_tokens": 0, "completion_tokens": 0, "cached": True}
+
+    llm_service = LLMService()
+    summary = llm_service.run_task(task_type="summarization", prompt=text, template=template)
+    usage = llm_service.last_usage
+    try:
+        set_cached_result("summary", model, template + text, summary)
+    except Exception as e:
+        print(f"Failed to write chunk cache: {str(e)}")
+    return {
+        "summary": summary,
+        "prompt_tokens": usage.get("prompt_tokens") or 0,
+        "completion_tokens": usage.get("completion_tokens") or 0,
+        "model": usage.get("model"),
+        "backend": usage.get("backend"),
+        "cached": False,
+    }
+
+@celery_app.task
+def reduce_summaries(results, task_id: str, usage: dict, carried=None):
+    """
+    Сворачивает частичные резюме: пока они не помещаются в одну группу,
+    запускается следующий уровень параллельной свертки.
+    """
+    usage = dict(usage)
+    for item in results:
+        _add_usage(usage, item)
+
+    summaries = merge_carried(carried, [item["summary"] for item in results])
+    plan = plan_reduce(summaries, settings.SUMMARY_CHUNK_TOKENS, settings.SUMMARY_REDUCE_FANIN)
+    if plan is not None:
+        # The final combine is a level of its own too, so that it is retried like any other part
+        texts, carried = plan
+        _start_summary_level(task_id, texts, REDUCE_TEMPLATE, usage, carried)
+        return None
+
+    result = summaries[0]
+    db = SyncSessionLocal()
+    try:
+        task = db.query(Task).filter(Task.id == task_id).first()
+        if task:
+            _complete_task(db, task, result, usage)
+    finally:
+        db.close()
+    return result
+
+@celery_app.task
+def fail_chord_task(request, exc, traceback, task_id: str):
+    """
+    Помечает задание как неуспешное, если одна из частей документа
+    или один из шагов workflow не обработался.
+    """
+    db = SyncSessionLocal()
+    try:
+        task = db.query(Task).filter(Task.id == task_id).first()
+        if task:
+            task.status = TaskStatus.FAILED
+            task.result = str(exc)
+            _commit_task(db, task)
+    finally:
+        db.close()
+
+# Workflow-задания: DAG шагов LLM внутри одного задания
+
+def _start_workflow_level(task_id: str, spec: dict, level: int, prompt: str, outputs: dict, usage: dict,
+                          jobs=None):
+    """
+    Запускает параллельно шаги одного уровня DAG; результаты собирает advance_workflow.
+    Результаты предыдущих шагов передаются в аргументах, без чтения из БД.
+    jobs - продолжение уровня: очередной шаг свертки длинных шагов суммаризации.
+    """
+    if jobs is None:
+        jobs = []
+        for step in workflow_levels(spec["steps"])[level]:
+            text = step_input(step, prompt, outputs)
+            if step["task_type"] == "summarization" and needs_chunking(text, settings.SUMMARY_CHUNK_TOKENS):
+                # Long inputs (e.g. the joined outputs of earlier steps) go through map-reduce
+                jobs.append({"step": step["id"], "template": MAP_TEMPLATE, "carried": None,
+                             "texts": split_into_chunks(text, settings.SUMMARY_CHUNK_TOKENS)})
+            else:
+                jobs.append({"step": step["id"], "task_type": step["task_type"], "texts": [text]})
+
+    header = []
+    for job in jobs:
+        if "template" in job:
+            header.extend(summarize_chunk.s(text, job["template"]) for text in job["texts"])
+        else:
+            header.append(run_workflow_step.s(job["task_type"], job["texts"][0]))
+    # The callback only needs to know which results belong to which step
+    layout = [{**{k: v for k, v in job.items() if k != "texts"}, "parts": len(job["texts"])} for job in jobs]
+    callback = advance_workflow.s(task_id, spec, level, outputs, usage, layout)
+    callback.on_error(fail_chord_task.s(task_id))
+    chord(header)(callback)
+
+@celery_app.task(autoretry_for=(Exception,), retry_backoff=True, max_retries=3)
+def run_workflow_step(task_type: str, text: str) -> dict:
+    """
+    Один шаг workflow. Результаты кэшируются по типу задачи, модели и входу,
+    поэтому повторный запуск пересчитывает только шаги с изменившимся входом.
+    """
+    model = model_for_task(task_type)
+    try:
+        cached = get_cached_result(task_type, model, text)
+    except Exception as e:
+        print(f"Failed to read workflow step cache: {str(e)}")
+        cached = None
+    record_cache("workflow_step", cached is not None)
+    if cached is not None:
+        return {"output": cached, "prompt_tokens": 0, "completion_tokens": 0, "cached": True}
+
+    llm_service = LLMService()
+    output = llm_service.run_task(task_type=task_type, prompt=text)
+    usage = llm_service.last_usage
+    try:
+        set_cached_result(task_type, model, text, output)
+    except Exception as e:
+        print(f"Failed to write workflow step cache: {str(e)}")
+    return {
+        "output": output,
+        "prompt_tokens": usage.get("prompt_tokens") or 0,
+        "completion_tokens": usage.get("completion_tokens") or 0,
+        "model": usage.get("model"),
+        "backend": usage.get("backend"),
+        "cached": False,
+    }
+
+@celery_app.task
+def advance_workflow(results, task_id: str, spec: dict, level: int, outputs: dict, usage: dict,
+                     layout: list = None):
+    """
+    Сохраняет прогресс после уровня DAG и запускает следующий уровень,
+    а после последнего завершает задание результатом выходного шага.
+    Пока длинные шаги суммаризации уровня не свернуты до одного резюме,
+    запускается очередной шаг их свертки.
+    """
+    levels = workflow_levels(spec["steps"])
+    outputs = dict(outputs)
+    usage = dict(usage)
+    for item in results:
+        _add_usage(usage, item)
+
+    if layout is None:
+        # Chords queued before long steps were split have one result per step
+        layout = [{"step": step["id"], "parts": 1} for step in levels[level]]
+    # Chord results come in the order of the jobs and their parts
+    pending = []
+    position = 0
+    for job in layout:
+        items = results[position:position + job["parts"]]
+        position += job["parts"]
+        if "template" not in job:
+            outputs[job["step"]] = items[0]["output"]
+            continue
+        summaries = merge_carried(job["carried"], [item["summary"] for item in items])
+        plan = plan_reduce(summaries, settings.SUMMARY_CHUNK_TOKENS, settings.SUMMARY_REDUCE_FANIN)
+        if plan is None:
+            outputs[job["step"]] = summaries[0]
+        else:
+            texts, carried = plan
+            pending.append({"step": job["step"], "template": REDUCE_TEMPLATE, "carried": carried, "texts": texts})
+    if pending:
+        _start_workflow_level(task_id, spec, level, None, outputs, usage, pending)
+        return None
+    last_level = level + 1 == len(levels)
+
+    db = SyncSessionLocal()
+    try:
+        task = db.query(Task).filter(Task.id == task_id).first()
+        if not task:
+            # Deleted while running
+            return None
+        task.steps_done = sum(len(steps) for steps in levels[:level + 1])
+        if last_level:
+            _complete_task(db, task, outputs[spec["output"]], usage)
+        else:
+            _commit_task(db, task)
+    finally:
+        db.close()
+
+    if last_level:
+        return outputs[spec["output"]]
+    _start_workflow_level(task_id, spec, level + 1, None, outputs, usage)
+    return None
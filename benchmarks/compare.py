@@ -0,0 +1,81 @@
+"""
+Compares two load-test reports of benchmarks/load_test.py.
+
+Prints the relative change of throughput and latency percentiles per
+operation, end-to-end task latency and resource use as JSON, and exits with
+code 1 if any of them regressed by more than --threshold.
+
+    python benchmarks/compare.py before.json after.json --threshold 0.1
+"""
+
+import argparse
+import json
+import sys
+
+LATENCY_KEYS = ("p50", "p95", "p99")
+
+def _change(before, after):
+    if before in (None, 0) or after is None:
+        return None
+    return round((after - before) / before, 4)
+
+def _entry(before, after, higher_is_better: bool, threshold: float) -> dict:
+    change = _change(before, after)
+    regression = change is not None and (-change if higher_is_better else change) > threshold
+    return {"before": before, "after": after, "change": change, "regression": regression}
+
+def compare(before: dict, after: dict, threshold: float) -> dict:
+    metrics = {}
+    for action in sorted(set(before["operations"]) | set(after["operations"])):
+        old = before["operations"].get(action, {})
+        new = after["operations"].get(action, {})
+        metrics[f"{action}.throughput_rps"] = _entry(old.get("throughput_rps"), new.get("throughput_rps"), True, threshold)
+        for key in LATENCY_KEYS:
+            metrics[f"{action}.{key}_ms"] = _entry(
+                old.get("latency_ms", {}).get(key), new.get("latency_ms", {}).get(key), False, threshold
+            )
+        metrics[f"{action}.error_rate"] = _entry(
+            old.get("errors", 0) / old["count"] if old.get("count") else None,
+            new.get("errors", 0) / new["count"] if new.get("count") else None,
+            False, threshold
+        )
+
+    metrics["tasks.completed_per_second"] = _entry(
+        before["tasks"]["completed_per_second"], after["tasks"]["completed_per_second"], True, threshold
+    )
+    for key in LATENCY_KEYS:
+        metrics[f"tasks.end_to_end_{key}_ms"] = _entry(
+            before["tasks"]["end_to_end_ms"][key], after["tasks"]["end_to_end_ms"][key], False, threshold
+        )
+
+    for role in sorted(set(before.get("resources") or {}) & set(after.get("resources") or {})):
+        for key in ("cpu_seconds", "max_rss_mb"):
+            metrics[f"resources.{role}.{key}"] = _entry(
+                before["resources"][role][key], after["resources"][role][key], False, threshold
+            )
+
+    return {
+        "before": before.get("meta", {}).get("git_commit"),
+        "after": after.get("meta", {}).get("git_commit"),
+        "threshold": threshold,
+        "regressions": [name for name, entry in metrics.items() if entry["regression"]],
+        "metrics": metrics,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    result = compare(before, after, args.threshold)
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if result["regressions"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Mock LLM server for load tests: speaks enough of the Ollama and OpenAI HTTP
+APIs for LLMService, the warm-up routine and the keep-alive pings.
+
+Latency is simulated, not computed: every request waits for a free slot
+(like OLLAMA_NUM_PARALLEL), pays a model load on a cold start, a prefill time
+proportional to the prompt length, and then streams output tokens at a fixed
+rate. GET /stats returns counters for the benchmark report.
+
+    python benchmarks/mock_llm.py --port 11500 --tokens-per-second 50 --output-tokens 120
+
+Point the app at it with OLLAMA_BASE_URL=http://localhost:11500 or
+OPENAI_API_BASE=http://localhost:11500/v1.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.services.llm_utils import estimate_tokens, normalize_model_name, parse_keep_alive
+
+WORDS = ("the", "model", "summary", "of", "text", "and", "a", "result", "with", "key", "facts", "is")
+DEFAULT_KEEP_ALIVE = "5m"
+
+class MockLLM:
+    """
+    Модель задержек: очередь на слоты, загрузка модели при холодном старте,
+    prefill по длине промпта и генерация с постоянной скоростью.
+    """
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.slots = asyncio.Semaphore(args.parallel)
+        # model -> unload time (monotonic), inf for keep_alive < 0
+        self.resident = {}
+        self.loading = {}
+        self.stats = {
+            "requests": 0, "active": 0, "max_active": 0, "cold_starts": 0,
+            "prompt_tokens": 0, "completion_tokens": 0, "queue_wait_seconds": 0.0,
+        }
+
+    def _jitter(self, value: float) -> float:
+        return max(0.0, value * (1 + self.rng.uniform(-self.args.jitter, self.args.jitter)))
+
+    def output_tokens(self, limit=None) -> int:
+        tokens = max(1, round(self._jitter(self.args.output_tokens)))
+        return min(tokens, limit) if limit else tokens
+
+    async def ensure_loaded(self, model: str, keep_alive) -> float:
+        """
+        Загружает модель, если она не резидентна, и продлевает keep_alive.
+        Возвращает время загрузки в секундах (0 для теплой модели).
+        """
+        model = normalize_model_name(model)
+        now = time.monotonic()
+        load_seconds = 0.0
+        if self.resident.get(model, 0) <= now:
+            # Concurrent requests for a cold model wait for the same load
+            if model not in self.loading:
+                self.loading[model] = asyncio.ensure_future(asyncio.sleep(self._jitter(self.args.load_ms) / 1000))
+                self.stats["cold_starts"] += 1
+            started = time.monotonic()
+            await self.loading[model]
+            self.loading.pop(model, None)
+            load_seconds = time.monotonic() - started
+        seconds = parse_keep_alive(keep_alive if keep_alive is not None else DEFAULT_KEEP_ALIVE)
+        self.resident[model] = float("inf") if seconds < 0 else time.monotonic() + seconds
+        return load_seconds
+
+    async def generate(self, model: str, prompt: str, keep_alive=None, max_tokens=None):
+        """
+        Асинхронный генератор: сначала словарь с временами загрузки и prefill,
+        затем токены ответа по одному.
+        """
+        self.stats["requests"] += 1
+        queued = time.monotonic()
+        async with self.slots:
+            self.stats["queue_wait_seconds"] += time.monotonic() - queued
+            self.stats["active"] += 1
+            self.stats["max_active"] = max(self.stats["max_active"], self.stats["active"])
+            try:
+                load_seconds = await self.ensure_loaded(model, keep_alive)
+                prompt_tokens = estimate_tokens(prompt)
+                prefill_seconds = self._jitter(self.args.ttft_ms) / 1000 + prompt_tokens / self.args.prefill_tokens_per_second
+                await asyncio.sleep(prefill_seconds)
+                count = self.output_tokens(max_tokens) if prompt else 0
+                self.stats["prompt_tokens"] += prompt_tokens
+                yield {"load": load_seconds, "prefill": prefill_seconds, "prompt_tokens": prompt_tokens, "completion_tokens": count}
+                for i in range(count):
+                    await asyncio.sleep(1 / self.args.tokens_per_second)
+                    self.stats["completion_tokens"] += 1
+                    yield (" " if i else "") + self.rng.choice(WORDS)
+            finally:
+                self.stats["active"] -= 1
+
+    def ps(self):
+        now = time.monotonic()
+        models = []
+        for model, until in self.resident.items():
+            if until > now:
+                expires = "0001-01-01T00:00:00Z" if until == float("inf") else _timestamp(time.time() + until - now)
+                models.append({"name": model, "model": model, "size": 0, "digest": "", "expires_at": expires, "size_vram": 0})
+        return {"models": models}
+
+def _timestamp(seconds: float = None) -> str:
+    moment = datetime.fromtimestamp(seconds if seconds is not None else time.time(), tz=timezone.utc)
+    return moment.isoformat().replace("+00:00", "Z")
+
+def _ns(seconds: float) -> int:
+    return int(seconds * 1e9)
+
+def create_app(args) -> FastAPI:
+    app = FastAPI(title="Mock LLM")
+    mock = MockLLM(args)
+
+    @app.get("/stats")
+    async def stats():
+        return {**mock.stats, "resident_models": [m["name"] for m in mock.ps()["models"]]}
+
+    # --- Ollama ---
+
+    @app.get("/api/version")
+    async def version():
+        return {"version": "0.0.0-mock"}
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": m, "model": m} for m in mock.resident]}
+
+    @app.get("/api/ps")
+    async def ps():
+        return mock.ps()
+
+    @app.post("/api/generate")
+    async def ollama_generate(request: Request):
+        body = await request.json()
+        model = body.get("model", "mock")
+        prompt = body.get("prompt") or ""
+        started = time.monotonic()
+        options = body.get("options") or {}
+        stream = mock.generate(model, prompt, body.get("keep_alive"), options.get("num_predict"))
+
+        def final(timings, text):
+            return {
+                "model": model, "created_at": _timestamp(), "response": text, "done": True, "done_reason": "stop",
+                "total_duration": _ns(time.monotonic() - started), "load_duration": _ns(timings["load"]),
+                "prompt_eval_count": timings["prompt_tokens"], "prompt_eval_duration": _ns(timings["prefill"]),
+                "eval_count": timings["completion_tokens"],
+                "eval_duration": _ns(timings["completion_tokens"] / args.tokens_per_second),
+            }
+
+        if body.get("stream", True) is False:
+            timings = await stream.__anext__()
+            text = "".join([token async for token in stream])
+            return final(timings, text)
+
+        async def lines():
+            timings = await stream.__anext__()
+            async for token in stream:
+                yield json.dumps({"model": model, "created_at": _timestamp(), "response": token, "done": False}) + "\n"
+            yield json.dumps(final(timings, "")) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    # --- OpenAI ---
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": args.openai_model, "object": "model", "owned_by": "mock"}]}
+
+    async def openai_completion(body, prompt, chat):
+        model = body.get("model", args.openai_model)
+        stream = mock.generate(model, prompt, -1, body.get("max_tokens"))
+        timings = await stream.__anext__()
+        completion_id = f"cmpl-{uuid.uuid4().hex}"
+        kind = "chat.completion" if chat else "text_completion"
+
+        def choice(text, finish_reason):
+            if chat:
+                key = "delta" if body.get("stream") else "message"
+                return {"index": 0, key: {"role": "assistant", "content": text}, "finish_reason": finish_reason}
+            return {"index": 0, "text": text, "logprobs": None, "finish_reason": finish_reason}
+
+        usage = {
+            "prompt_tokens": timings["prompt_tokens"],
+            "completion_tokens": timings["completion_tokens"],
+            "total_tokens": timings["prompt_tokens"] + timings["completion_tokens"],
+        }
+        if not body.get("stream"):
+            text = "".join([token async for token in stream])
+            return JSONResponse({
+                "id": completion_id, "object": kind, "created": int(time.time()), "model": model,
+                "choices": [choice(text, "stop")], "usage": usage,
+            })
+
+        async def events():
+            chunk_kind = "chat.completion.chunk" if chat else kind
+            async for token in stream:
+                chunk = {"id": completion_id, "object": chunk_kind, "created": int(time.time()), "model": model,
+                         "choices": [choice(token, None)]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            chunk = {"id": completion_id, "object": chunk_kind, "created": int(time.time()), "model": model,
+                     "choices": [choice("", "stop")], "usage": usage}
+            yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        prompt = body.get("prompt") or ""
+        if isinstance(prompt, list):
+            prompt = prompt[0] if prompt else ""
+        return await openai_completion(body, prompt, chat=False)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        prompt = "\n".join(str(m.get("content") or "") for m in body.get("messages", []))
+        return await openai_completion(body, prompt, chat=True)
+
+    return app
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--ttft-ms", type=float, default=100, help="Fixed latency before the first token")
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=2000, help="Prompt processing rate")
+    parser.add_argument("--tokens-per-second", type=float, default=50, help="Output token rate per request")
+    parser.add_argument("--output-tokens", type=int, default=120, help="Mean number of generated tokens")
+    parser.add_argument("--load-ms", type=float, default=3000, help="Model load time on a cold start")
+    parser.add_argument("--parallel", type=int, default=4, help="Requests processed at once, the rest queue")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Relative random variation of all timings")
+    parser.add_argument("--openai-model", default="gpt-3.5-turbo-instruct")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser
+
+def main():
+    args = build_parser().parse_args()
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Microbenchmark of task response serialization.
+
+Fills an in-memory SQLite database with --tasks tasks and times, as JSON:
+  * listing paths, from the query to the response body:
+      orm_default   - select(Task), TaskResponse per object, default JSON encoder
+      orm_adapter   - select(Task), TypeAdapter(List[TaskResponse]) for the whole list
+      rows_adapter  - row tuples of the response columns, TypeAdapter
+      rows_orjson   - row tuples of the response columns, orjson (used by the API)
+  * detail serialization of a single task (jsonable_encoder vs model_dump_json).
+All listing paths must produce the same JSON; the report says whether they do.
+
+    python benchmarks/serialization.py --tasks 10000 --runs 5
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.core.responses import ORJSONResponse, rows_to_dicts
+from app.db.models import Base, Task, TaskStatus
+from app.schemas.tasks import TaskResponse, TASK_RESPONSE_COLUMNS
+
+TASK_TYPES = ("summarization", "translation", "code_generation")
+TaskListAdapter = TypeAdapter(List[TaskResponse])
+
+def fill(engine, count: int, seed: int):
+    rng = random.Random(seed)
+    users = [uuid.uuid4() for _ in range(50)]
+    started = datetime(2024, 1, 1)
+    tasks = []
+    for i in range(count):
+        status = rng.choice(list(TaskStatus))
+        created_at = started + timedelta(seconds=i)
+        done = status in (TaskStatus.COMPLETED, TaskStatus.FAILED)
+        tasks.append(Task(
+            id=uuid.UUID(int=rng.getrandbits(128)),
+            user_id=rng.choice(users),
+            task_type=rng.choice(TASK_TYPES),
+            prompt="Текст задания " * rng.randint(5, 50),
+            status=status,
+            result=("Результат " * rng.randint(5, 80)) if done else None,
+            created_at=created_at,
+            started_at=created_at + timedelta(milliseconds=250) if status != TaskStatus.PENDING else None,
+            completed_at=created_at + timedelta(seconds=3) if done else None,
+            model="llama3" if done else None,
+            backend="ollama" if done else None,
+            prompt_tokens=rng.randint(10, 2000) if done else None,
+            completion_tokens=rng.randint(10, 800) if done else None,
+            duration_ms=rng.randint(200, 20000) if done else None,
+            load_ms=0 if done else None,
+        ))
+    with Session(engine) as session:
+        session.add_all(tasks)
+        session.commit()
+
+def json_body(content) -> bytes:
+    # Same encoding as fastapi.responses.JSONResponse
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(",", ":")).encode("utf-8")
+
+def orm_default(engine) -> bytes:
+    with Session(engine) as session:
+        tasks = session.execute(select(Task)).scalars().all()
+        content = jsonable_encoder([TaskResponse.model_validate(task) for task in tasks])
+    return json_body(content)
+
+def orm_adapter(engine) -> bytes:
+    with Session(engine) as session:
+        tasks = session.execute(select(Task)).scalars().all()
+        return TaskListAdapter.dump_json(TaskListAdapter.validate_python(tasks, from_attributes=True))
+
+def rows_adapter(engine) -> bytes:
+    with Session(engine) as session:
+        rows = rows_to_dicts(session.execute(select(*TASK_RESPONSE_COLUMNS)))
+    return TaskListAdapter.dump_json(TaskListAdapter.validate_python(rows))
+
+def rows_orjson(engine) -> bytes:
+    with Session(engine) as session:
+        rows = rows_to_dicts(session.execute(select(*TASK_RESPONSE_COLUMNS)))
+    return ORJSONResponse(rows).body
+
+LISTING_PATHS = {
+    "orm_default": orm_default,
+    "orm_adapter": orm_adapter,
+    "rows_adapter": rows_adapter,
+    "rows_orjson": rows_orjson,
+}
+
+def timed(func, runs: int):
+    timings = []
+    result = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return result, {"median_ms": round(statistics.median(timings), 2), "min_ms": round(min(timings), 2)}
+
+def bench_detail(engine, runs: int, sample: int) -> dict:
+    with Session(engine) as session:
+        tasks = session.execute(select(Task).limit(sample)).scalars().all()
+        paths = {
+            "jsonable_encoder": lambda: [json_body(jsonable_encoder(TaskResponse.model_validate(t)))
+                                         for t in tasks],
+            "model_dump_json": lambda: [TaskResponse.model_validate(t).model_dump_json().encode("utf-8")
+                                        for t in tasks],
+        }
+        report = {}
+        for name, func in paths.items():
+            _, stats = timed(func, runs)
+            stats["per_task_us"] = round(stats["median_ms"] * 1000 / len(tasks), 2)
+            report[name] = stats
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=10000, help="Tasks in the listing")
+    parser.add_argument("--runs", type=int, default=5, help="Timed runs per path")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    fill(engine, args.tasks, args.seed)
+
+    listing = {}
+    bodies = {}
+    for name, func in LISTING_PATHS.items():
+        bodies[name], listing[name] = timed(lambda: func(engine), args.runs)
+        listing[name]["bytes"] = len(bodies[name])
+    baseline = listing["orm_default"]["median_ms"]
+    for stats in listing.values():
+        stats["speedup"] = round(baseline / stats["median_ms"], 1)
+
+    reference = orjson.loads(bodies["orm_default"])
+    report = {
+        "tasks": args.tasks,
+        "runs": args.runs,
+        "listing": listing,
+        "identical_output": all(orjson.loads(body) == reference for body in bodies.values()),
+        "detail": bench_detail(engine, args.runs, min(args.tasks, 1000)),
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+    sys.exit(0 if report["identical_output"] else 1)
+
+if __name__ == "__main__":
+    main()
@@ -12,11 +12,11 @@ os.environ['SECRET_KEY'] = 'test-secret-key'
 
 def test_database_connection():
     try:
-        from app.db.session import sync_engine
+        from app.db.session import get_sync_engine
         from sqlalchemy import text
         
         print("Testing database connection...")
-        with sync_engine.connect() as connection:
+        with get_sync_engine().connect() as connection:
             result = connection.execute(text("SELECT 1"))
             print("Database connection successful!")
             return True
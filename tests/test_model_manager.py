@@ -0,0 +1,28 @@
+import pytest
+
+from app.core.config import settings
+from app.services import model_manager
+from app.services.llm_utils import parse_keep_alive
+from app.services.model_manager import mark_resident
+
+@pytest.mark.parametrize("value, seconds", [
+    ("30m", 1800), ("1h", 3600), ("1h30m", 5400), ("300", 300), ("500ms", 0.5),
+    ("0", 0), ("0s", 0), ("-1", -1), ("-1m", -60),
+])
+def test_parse_keep_alive(value, seconds):
+    assert parse_keep_alive(value) == seconds
+
+@pytest.mark.parametrize("keep_alive, ttl", [("30m", 1800), ("0", 0), ("-1", 3600)])
+def test_residency_ttl(monkeypatch, keep_alive, ttl):
+    monkeypatch.setattr(settings, "OLLAMA_KEEP_ALIVE", keep_alive)
+    monkeypatch.setattr(settings, "OLLAMA_KEEP_ALIVE_INTERVAL", 300)
+    assert model_manager._residency_ttl() == ttl
+
+def test_zero_keep_alive_never_marks_resident(monkeypatch):
+    monkeypatch.setattr(settings, "OLLAMA_KEEP_ALIVE", "0")
+
+    def no_redis():
+        raise AssertionError("a model unloaded right away must not be recorded")
+
+    monkeypatch.setattr(model_manager, "get_sync_redis", no_redis)
+    mark_resident("llama3", "http://a:11434")
@@ -0,0 +1,115 @@
+import uuid
+
+import pytest
+import redis
+
+from app.core.config import settings
+from app.services.routing import BackendRouter, RedisLoadTracker, prompt_fingerprint
+
+BACKENDS = ["http://a:11434", "http://b:11434", "http://c:11434", "http://d:11434"]
+
+class FixedLoads:
+    def __init__(self, loads=None):
+        self.current = dict(loads or {})
+
+    def loads(self):
+        return dict(self.current)
+
+    def acquire(self, backend):
+        self.current[backend] = self.current.get(backend, 0) + 1
+
+    def release(self, backend):
+        self.current[backend] -= 1
+
+def _ring_order(router, prompt, model="llama3"):
+    return router._candidates(prompt_fingerprint(model, prompt, router.prefix_chars))
+
+def test_same_prefix_goes_to_same_backend():
+    router = BackendRouter(BACKENDS, load_tracker=FixedLoads(), prefix_chars=32)
+    preamble = "Shared document preamble " * 4
+    chosen = {router.choose("llama3", preamble + f" question {i}") for i in range(20)}
+    assert len(chosen) == 1
+
+def test_prompts_spread_over_backends():
+    router = BackendRouter(BACKENDS, load_tracker=FixedLoads())
+    chosen = {router.choose("llama3", f"prompt {i}") for i in range(200)}
+    assert chosen == set(BACKENDS)
+
+def test_overloaded_backend_spills_to_next_on_ring():
+    prompt = "Summarize the quarterly report"
+    router = BackendRouter(BACKENDS, load_tracker=FixedLoads(), load_factor=1.25)
+    first, second = _ring_order(router, prompt)[:2]
+    # Average load with the new request is 1, so the bound is 1.25
+    router.load_tracker = FixedLoads({first: 3})
+    assert router.choose("llama3", prompt) == second
+    router.load_tracker = FixedLoads({first: 3, second: 3})
+    assert router.choose("llama3", prompt) == _ring_order(router, prompt)[2]
+
+def test_all_backends_over_bound_picks_least_loaded():
+    loads = {backend: 10 for backend in BACKENDS}
+    loads[BACKENDS[2]] = 4
+    router = BackendRouter(BACKENDS, load_tracker=FixedLoads(loads), load_factor=0.5)
+    assert router.choose("llama3", "any prompt") == BACKENDS[2]
+
+def test_preferred_backends_are_tried_first():
+    prompt = "Translate the following text"
+    router = BackendRouter(BACKENDS, load_tracker=FixedLoads())
+    order = _ring_order(router, prompt)
+    assert router.choose("llama3", prompt, preferred={order[-1]}) == order[-1]
+    # A loaded preferred backend still spills, to the next preferred one first
+    router.load_tracker = FixedLoads({order[-1]: 3})
+    assert router.choose("llama3", prompt, preferred={order[-1], order[-2]}) == order[-2]
+
+def test_route_releases_backend():
+    tracker = FixedLoads()
+    router = BackendRouter(BACKENDS, load_tracker=tracker)
+    with pytest.raises(RuntimeError):
+        with router.route("llama3", "prompt") as backend:
+            assert tracker.current[backend] == 1
+            raise RuntimeError("LLM call failed")
+    assert tracker.current[backend] == 0
+
+def test_least_loaded_ignores_prompt_and_rotates_ties():
+    router = BackendRouter(BACKENDS, load_tracker=FixedLoads(), strategy="least_loaded")
+    chosen = [router.choose("llama3", "same prompt") for _ in range(len(BACKENDS))]
+    assert sorted(chosen) == sorted(BACKENDS)
+    router.load_tracker = FixedLoads({b: 2 for b in BACKENDS} | {BACKENDS[1]: 1})
+    assert router.choose("llama3", "same prompt") == BACKENDS[1]
+
+def test_least_loaded_prefers_resident_backends_on_ties():
+    router = BackendRouter(BACKENDS, load_tracker=FixedLoads(), strategy="least_loaded")
+    assert all(router.choose("llama3", "p", preferred={BACKENDS[3]}) == BACKENDS[3] for _ in range(4))
+    router.load_tracker = FixedLoads({BACKENDS[3]: 1})
+    assert router.choose("llama3", "p", preferred={BACKENDS[3]}) != BACKENDS[3]
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        BackendRouter(BACKENDS, strategy="random")
+
+@pytest.fixture
+def redis_client():
+    client = redis.Redis.from_url(settings.REDIS_URL)
+    try:
+        client.ping()
+    except redis.exceptions.ConnectionError:
+        pytest.skip("Redis is not available")
+    yield client
+    client.close()
+
+def test_release_never_goes_below_zero(redis_client):
+    backend = f"http://test-{uuid.uuid4()}:11434"
+    tracker = RedisLoadTracker([backend], redis_client)
+    key = tracker._key(backend)
+    tracker.acquire(backend)
+    tracker.acquire(backend)
+    redis_client.expire(key, 5)
+    tracker.release(backend)
+    assert tracker.loads() == {backend: 1}
+    # Release resets the TTL of the remaining counter
+    assert redis_client.ttl(key) > 5
+    tracker.release(backend)
+    assert redis_client.exists(key) == 0
+    # The key expired (or was never set) before release: no negative counter is left
+    tracker.release(backend)
+    assert redis_client.exists(key) == 0
+    assert tracker.loads() == {backend: 0}
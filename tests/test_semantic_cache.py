@@ -0,0 +1,59 @@
+import pytest
+
+from app.services.semantic_cache import SemanticCache, is_trivial_edit, normalize_text
+
+BASE = "Please summarize the following quarterly report about our customers"
+
+@pytest.mark.parametrize("query", [
+    BASE.upper(),
+    "  please summarize, the following quarterly report about our customers!\n",
+])
+def test_exact_mode_hits_after_normalization(query):
+    cache = SemanticCache(threshold=0.9, capacity=10, dim=256)
+    cache.put("summarization", "m", BASE, "result")
+    assert cache.get("summarization", "m", query) == "result"
+
+def test_exact_mode_rejects_typos():
+    cache = SemanticCache(threshold=0.9, capacity=10, dim=256)
+    cache.put("summarization", "m", BASE, "result")
+    assert cache.get("summarization", "m", BASE.replace("quarterly", "quatrerly")) is None
+
+@pytest.mark.parametrize("a, b", [
+    ("quarterly", "quatrerly"),  # swapped letters
+    ("customers", "custmers"),   # dropped letter
+    ("following", "folowing"),
+    ("summarize", "summarise"),
+])
+def test_typos_are_trivial(a, b):
+    assert is_trivial_edit(normalize_text(BASE), normalize_text(BASE.replace(a, b)))
+
+@pytest.mark.parametrize("a, b", [
+    ("possible", "impossible"),
+    ("agree", "disagree"),
+    ("send", "sent"),
+    ("walk", "walked"),
+    ("valid", "invalid"),
+    ("likely", "unlikely"),
+    ("affect", "effect"),
+    ("report", "reports"),
+    ("the", "a"),
+    ("customers", "costumers2"),
+])
+def test_meaning_changes_are_not_trivial(a, b):
+    text = f"it is {a} to finish the report"
+    assert not is_trivial_edit(normalize_text(text), normalize_text(text.replace(a, b)))
+
+def test_typo_mode_accepts_typos_and_rejects_prefixes():
+    cache = SemanticCache(threshold=0.5, capacity=10, dim=256, match="typo")
+    cache.put("summarization", "m", BASE + " if possible", "result")
+    assert cache.get("summarization", "m", BASE.replace("quarterly", "quatrerly") + " if possible") == "result"
+    assert cache.get("summarization", "m", BASE + " if impossible") is None
+
+def test_similarity_mode_is_decided_by_threshold():
+    query = BASE.replace("customers", "clients")
+    loose = SemanticCache(threshold=0.5, capacity=10, dim=256, match="similarity")
+    loose.put("summarization", "m", BASE, "result")
+    assert loose.get("summarization", "m", query) == "result"
+    strict = SemanticCache(threshold=0.99, capacity=10, dim=256, match="similarity")
+    strict.put("summarization", "m", BASE, "result")
+    assert strict.get("summarization", "m", query) is None
@@ -0,0 +1,74 @@
+from app.services.llm_utils import estimate_tokens
+from app.services.summarization import (
+    SUMMARY_SEPARATOR, group_for_reduce, merge_carried, plan_reduce, split_into_chunks
+)
+
+def _paragraph(i: int, words: int) -> str:
+    return f"p{i} " + " ".join(f"w{i}x{j}" for j in range(words))
+
+def test_short_text_is_one_chunk():
+    text = SUMMARY_SEPARATOR.join(_paragraph(i, 10) for i in range(3))
+    assert split_into_chunks(text, 2000) == [text]
+
+def test_chunks_respect_token_budget_and_keep_all_text():
+    text = SUMMARY_SEPARATOR.join(_paragraph(i, 60) for i in range(40))
+    chunks = split_into_chunks(text, 300)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 300 for chunk in chunks)
+    assert SUMMARY_SEPARATOR.join(chunks).split() == text.split()
+
+def test_long_paragraph_is_split_on_words():
+    paragraph = _paragraph(0, 2000)
+    chunks = split_into_chunks(paragraph, 200)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 200 for chunk in chunks)
+    assert " ".join(chunks).split() == paragraph.split()
+
+def test_edit_only_changes_nearby_chunks():
+    paragraphs = [_paragraph(i, 60) for i in range(60)]
+    before = split_into_chunks(SUMMARY_SEPARATOR.join(paragraphs), 300)
+    paragraphs[30] = _paragraph(30, 61)
+    after = split_into_chunks(SUMMARY_SEPARATOR.join(paragraphs), 300)
+    assert len(set(before) - set(after)) <= 3
+
+def test_groups_respect_fanin_and_budget():
+    summaries = ["s" * 400] * 10  # 100 tokens each
+    groups = group_for_reduce(summaries, chunk_tokens=350, fanin=8)
+    assert [len(g) for g in groups] == [3, 3, 3, 1]
+    groups = group_for_reduce(summaries, chunk_tokens=10000, fanin=4)
+    assert [len(g) for g in groups] == [4, 4, 2]
+    assert [s for g in groups for s in g] == summaries
+
+def test_oversized_summaries_are_paired():
+    # Each summary alone is over half the budget, so no two fit together
+    summaries = [f"{i}" + "s" * 4400 for i in range(5)]
+    groups = group_for_reduce(summaries, chunk_tokens=2000, fanin=8)
+    assert [len(g) for g in groups] == [2, 2, 1]
+    assert [s for g in groups for s in g] == summaries
+
+def test_reduce_levels_terminate_when_summaries_do_not_shrink():
+    summaries = ["s" * 4400] * 9
+    levels = 0
+    while len(summaries) > 1:
+        groups = group_for_reduce(summaries, chunk_tokens=2000, fanin=8)
+        assert len(groups) < len(summaries)
+        # A reduce that does not shrink its input: one summary per group
+        summaries = ["s" * 4400 for _ in groups]
+        levels += 1
+    assert levels == 4
+
+def test_single_summary_is_one_group():
+    assert group_for_reduce(["only"], chunk_tokens=10, fanin=8) == [["only"]]
+
+def test_plan_reduce_carries_singletons_and_ends_with_one_summary():
+    summaries = [f"{i}" + "s" * 4400 for i in range(5)]
+    texts, carried = plan_reduce(summaries, chunk_tokens=2000, fanin=8)
+    assert texts == [SUMMARY_SEPARATOR.join(summaries[0:2]), SUMMARY_SEPARATOR.join(summaries[2:4])]
+    assert carried == [None, None, summaries[4]]
+    assert merge_carried(carried, ["a", "b"]) == ["a", "b", summaries[4]]
+    # The last combine is planned like any other level
+    assert plan_reduce(["a", "b"], chunk_tokens=2000, fanin=8) == ([SUMMARY_SEPARATOR.join(["a", "b"])], [None])
+    assert plan_reduce(["done"], chunk_tokens=2000, fanin=8) is None
+
+def test_merge_without_carried_keeps_results():
+    assert merge_carried(None, ["a", "b"]) == ["a", "b"]
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+from starlette.requests import Request
+
+from app.api.deps import task_response
+from app.services import task_cache
+from app.services.task_cache import CachedTask, LocalLRU
+
+def _cached(status: str = "completed") -> CachedTask:
+    return CachedTask(json.dumps({"id": "t1", "user_id": "u1", "status": status, "result": "ok"}))
+
+def _request(if_none_match=None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+def test_response_without_if_none_match_has_body_and_etag():
+    cached = _cached()
+    response = task_response(cached, _request())
+    assert response.status_code == 200
+    assert response.body == cached.body.encode()
+    assert response.headers["etag"] == cached.etag
+
+@pytest.mark.parametrize("header", [
+    "{etag}",
+    "*",
+    " * ",
+    "W/{etag}",
+    '"other", {etag}',
+    '"other",W/{etag} , "third"',
+])
+def test_matching_if_none_match_is_not_modified(header):
+    cached = _cached()
+    response = task_response(cached, _request(header.format(etag=cached.etag)))
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == cached.etag
+
+@pytest.mark.parametrize("header", ['"other"', '"other", W/"another"', "", "{bare}"])
+def test_other_if_none_match_returns_body(header):
+    cached = _cached()
+    response = task_response(cached, _request(header.format(bare=cached.etag.strip('"'))))
+    assert response.status_code == 200
+    assert response.body == cached.body.encode()
+
+def test_etag_changes_with_status():
+    assert _cached("in_progress").etag != _cached("completed").etag
+
+def test_only_completed_and_failed_are_terminal():
+    assert _cached("completed").terminal and _cached("failed").terminal
+    assert not _cached("pending").terminal and not _cached("in_progress").terminal
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(task_cache.time, "monotonic", clock)
+    return clock
+
+def test_lru_entries_expire_after_ttl(clock):
+    lru = LocalLRU(4)
+    value = _cached()
+    lru.set("a", value, ttl=2)
+    clock.now += 1.9
+    assert lru.get("a") is value
+    clock.now += 0.1
+    assert lru.get("a") is None
+    # The expired entry is dropped, not only hidden
+    assert "a" not in lru._entries
+
+def test_lru_evicts_least_recently_used(clock):
+    lru = LocalLRU(2)
+    a, b, c = _cached("pending"), _cached("in_progress"), _cached("completed")
+    lru.set("a", a, ttl=60)
+    lru.set("b", b, ttl=60)
+    assert lru.get("a") is a  # "b" is now the least recently used
+    lru.set("c", c, ttl=60)
+    assert lru.get("b") is None
+    assert lru.get("a") is a and lru.get("c") is c
+
+def test_lru_set_replaces_value_and_ttl(clock):
+    lru = LocalLRU(2)
+    old, new = _cached("in_progress"), _cached("completed")
+    lru.set("a", old, ttl=1)
+    lru.set("a", new, ttl=60)
+    clock.now += 30
+    assert lru.get("a") is new
+    lru.delete("a")
+    assert lru.get("a") is None
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services import usage
+from app.services.llm_utils import estimate_tokens
+from app.services.usage import BUCKET_SECONDS, _window_keys, is_over_quota
+
+def test_window_covers_last_hours_including_current():
+    now = 1000 * BUCKET_SECONDS + 1234
+    keys = _window_keys("u1", now)
+    assert len(keys) == settings.QUOTA_WINDOW_HOURS
+    assert keys[0] == "usage:u1:1000"
+    assert keys[-1] == f"usage:u1:{1000 - settings.QUOTA_WINDOW_HOURS + 1}"
+
+def test_window_moves_on_bucket_boundary(monkeypatch):
+    monkeypatch.setattr(settings, "QUOTA_WINDOW_HOURS", 3)
+    assert _window_keys("u1", 5 * BUCKET_SECONDS - 1) == ["usage:u1:4", "usage:u1:3", "usage:u1:2"]
+    assert _window_keys("u1", 5 * BUCKET_SECONDS) == ["usage:u1:5", "usage:u1:4", "usage:u1:3"]
+
+@pytest.fixture
+def user_usage(monkeypatch):
+    current = {"tokens": 0, "tasks": 0}
+
+    async def fake_usage(user_id):
+        return dict(current)
+
+    monkeypatch.setattr(usage, "get_user_usage", fake_usage)
+    return current
+
+@pytest.mark.parametrize("token_quota, task_quota, tokens, tasks, over", [
+    (0, 0, 10 ** 9, 10 ** 6, False),  # no quotas
+    (1000, 0, 999, 50, False),
+    (1000, 0, 1000, 0, True),         # the limit itself is over quota
+    (0, 10, 10 ** 9, 9, False),
+    (0, 10, 0, 10, True),
+    (1000, 10, 500, 10, True),        # either limit is enough
+    (1000, 10, 1500, 1, True),
+])
+def test_is_over_quota(monkeypatch, user_usage, token_quota, task_quota, tokens, tasks, over):
+    monkeypatch.setattr(settings, "USER_TOKEN_QUOTA", token_quota)
+    monkeypatch.setattr(settings, "USER_TASK_QUOTA", task_quota)
+    user_usage.update(tokens=tokens, tasks=tasks)
+    assert asyncio.run(is_over_quota("u1")) is over
+
+def test_disabled_quotas_do_not_read_usage(monkeypatch):
+    monkeypatch.setattr(settings, "USER_TOKEN_QUOTA", 0)
+    monkeypatch.setattr(settings, "USER_TASK_QUOTA", 0)
+
+    async def no_redis(user_id):
+        raise AssertionError("usage must not be read without quotas")
+
+    monkeypatch.setattr(usage, "get_user_usage", no_redis)
+    assert asyncio.run(is_over_quota("u1")) is False
+
+@pytest.mark.parametrize("text, tokens", [("", 0), ("abc", 1), ("a" * 400, 100), ("a" * 403, 100)])
+def test_estimate_tokens(text, tokens):
+    assert estimate_tokens(text) == tokens
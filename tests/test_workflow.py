@@ -0,0 +1,47 @@
+import pytest
+from app.services.workflow import STEP_SEPARATOR, step_input, workflow_levels
+
+def _step(step_id: str, task_type: str = "summarization", after=()):
+    return {"id": step_id, "task_type": task_type, "after": list(after)}
+
+def _ids(levels):
+    return [[step["id"] for step in level] for level in levels]
+
+def test_independent_steps_share_a_level():
+    steps = [_step("tr", "translation"), _step("sum"), _step("final", after=["tr", "sum"])]
+    assert _ids(workflow_levels(steps)) == [["tr", "sum"], ["final"]]
+
+def test_levels_follow_dependencies_and_keep_spec_order():
+    steps = [
+        _step("d", after=["b", "c"]),
+        _step("c", after=["a"]),
+        _step("b", after=["a"]),
+        _step("a", "translation"),
+        _step("e", "translation"),
+    ]
+    assert _ids(workflow_levels(steps)) == [["a", "e"], ["c", "b"], ["d"]]
+
+def test_chain_has_one_step_per_level():
+    steps = [_step("a", "translation"), _step("b", after=["a"]), _step("c", "translation", after=["b"])]
+    assert _ids(workflow_levels(steps)) == [["a"], ["b"], ["c"]]
+
+@pytest.mark.parametrize("steps, message", [
+    ([], "at least one step"),
+    ([_step("a"), _step("a")], "Duplicate"),
+    ([_step("a", after=["missing"])], "unknown step"),
+    ([_step("a", after=["b"]), _step("b", after=["a"])], "cycle"),
+    ([_step("a", after=["a"])], "cycle"),
+    ([_step("a", "code_generation")], "Unknown task type"),
+    ([_step("a", "workflow")], "Unknown task type"),
+])
+def test_invalid_specs_are_rejected(steps, message):
+    with pytest.raises(ValueError, match=message):
+        workflow_levels(steps)
+
+def test_root_step_gets_the_prompt():
+    assert step_input(_step("a"), "prompt", {"x": "ignored"}) == "prompt"
+
+def test_step_input_joins_dependencies_in_listed_order():
+    outputs = {"tr": "translated", "sum": "summary"}
+    step = _step("final", after=["sum", "tr"])
+    assert step_input(step, "prompt", outputs) == STEP_SEPARATOR.join(["summary", "translated"])